@@ -1,40 +1,170 @@
 import os
 import sys
-import re
-import json
-import subprocess
+import time
+from contextlib import contextmanager
 
-from PyQt5.QtCore import Qt, QSize, QTimer, QObject, QRunnable, QThreadPool, pyqtSlot
+# Process start, for timing the cold-start phases
+START_TIME = time.perf_counter()
+
+from PyQt5.QtCore import Qt, QSize, QTimer, QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
 from PyQt5.QtGui import QFontDatabase, QIcon, QKeySequence, QTextCursor
+from PyQt5.QtNetwork import QLocalServer, QLocalSocket
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QPlainTextEdit,
     QPushButton, QLabel, QStatusBar, QToolBar, QAction,
     QFileDialog, QMessageBox, QDockWidget, QHBoxLayout, QLineEdit,
-    QTableWidget, QTableWidgetItem
+    QTableView, QAbstractItemView
 )
 
-from predict_ner import extract_and_append_entities
-from string_to_tag_matching import find_and_replace_tags
+# predict_ner and string_to_tag_matching load their models on import, ModelLoader imports them off the UI thread
+from inference_executor import get_executor
+from link_highlighter import LINK_PATTERN, LinkHighlighter, link_at
+from sentence_index import SentenceIndex
+from tag_store import get_store
+from tag_table_model import TagTableModel, TagFilterProxy
 
 # If a tag is deleted, then subsequent text-tag detections should remove [[]] from deleted tags
-# Change the implementation of 'refresh tags' button so that tags are auto updated every time 'ner_tags.json' changes
-# Change how 'extract_and_append_entities' and 'find_and_replace_tags' are triggered. 4 sentences triggering seems inconsistent
 # Implement a graph view of the tags
 
+SERVER_NAME = "NotepadX"
+
+# Quiet time after the last keystroke before NER and link matching run
+DEBOUNCE_MS = 800
+
+# Every document window hosted by this process, kept alive until it is closed
+open_windows = []
+
+
+class ModelState(QObject):
+    """Readiness of the NER and spaCy models, shared by every window of the process."""
+    status_changed = pyqtSignal(str)
+    ready_changed = pyqtSignal()
+
+    def __init__(self):
+        super().__init__()
+        self.ready = False
+        self.status = "Loading models…"
+        self.timings = {}
+
+    def set_status(self, status):
+        self.status = status
+        self.status_changed.emit(status)
+
+    @contextmanager
+    def timed(self, phase):
+        start = time.perf_counter()
+        yield
+        self.timings[phase] = time.perf_counter() - start
+        print(f"⏱ {phase}: {self.timings[phase]:.2f}s")
+
+
+models = ModelState()
+
+
+class ModelLoader(QRunnable):
+    """Imports and warms up the models in the background so the window opens at once."""
+
+    def __init__(self, state):
+        super().__init__()
+        self.state = state
+
+    @pyqtSlot()
+    def run(self):
+        state = self.state
+        start = time.perf_counter()
+        try:
+            with state.timed("import predict_ner"):
+                import predict_ner
+            with state.timed("start inference executor"):
+                executor = get_executor()
+            if predict_ner.server_available():
+                print("🧠 Using the running NER server")
+            elif executor.mode == "process":
+                state.set_status("Starting inference workers…")
+                with state.timed("load NER pipeline in workers"):
+                    executor.warm_up()
+            else:
+                state.set_status("Loading NER model…")
+                with state.timed("load NER pipeline"):
+                    predict_ner.load_pipeline()
+            state.set_status("Loading spaCy…")
+            with state.timed("load spaCy matcher"):
+                import string_to_tag_matching
+        except Exception as e:
+            print(f"❌ Failed to load models: {e}")
+            state.set_status(f"Model loading failed: {e}")
+            return
+        state.timings["models total"] = time.perf_counter() - start
+        state.ready = True
+        state.set_status(f"Models ready ({state.timings['models total']:.1f}s)")
+        state.ready_changed.emit()
+
 def update_ner_tags(filename):
     tag_entry = f"[[{filename.strip()}]]"
     try:
-        ner_tags = {}
-        if os.path.exists("ner_tags.json"):
-            with open("ner_tags.json", "r") as f:
-                ner_tags = json.load(f)
-        if tag_entry not in ner_tags:
-            ner_tags[tag_entry] = filename.strip()
-            with open("ner_tags.json", "w") as f:
-                json.dump(ner_tags, f, indent=4)
+        store = get_store()
+        if tag_entry not in store:
+            store.set(tag_entry, filename.strip())
             print(f"✅ Added tag: {tag_entry}")
     except Exception as e:
-        print(f"❌ Failed to update ner_tags.json: {e}")
+        print(f"❌ Failed to update tags: {e}")
+
+
+def open_document(path=None):
+    """Open `path` in a window of this process, raising its window if it is already open."""
+    if path:
+        path = os.path.abspath(path)
+        for window in open_windows:
+            if window.path and os.path.abspath(window.path) == path:
+                window.raise_()
+                window.activateWindow()
+                return window
+    window = AppDemo(path)
+    window.setAttribute(Qt.WA_DeleteOnClose)
+    open_windows.append(window)
+    window.destroyed.connect(lambda: open_windows.remove(window))
+    window.show()
+    return window
+
+
+def forward_to_running_instance(paths):
+    """Hand `paths` to an already running NotepadX process. Returns False if there is none."""
+    socket = QLocalSocket()
+    socket.connectToServer(SERVER_NAME)
+    if not socket.waitForConnected(200):
+        return False
+    # An empty line asks for a new untitled window
+    message = "\n".join(os.path.abspath(p) for p in paths) if paths else ""
+    socket.write((message + "\n").encode("utf-8"))
+    socket.waitForBytesWritten(1000)
+    socket.disconnectFromServer()
+    return True
+
+
+def listen_for_documents(app):
+    """Open documents sent by later launches of app.py in this process."""
+    server = QLocalServer(app)
+    # A crashed instance can leave a stale socket behind
+    QLocalServer.removeServer(SERVER_NAME)
+    if not server.listen(SERVER_NAME):
+        print(f"❌ Failed to listen for documents: {server.errorString()}")
+        return None
+
+    def accept():
+        socket = server.nextPendingConnection()
+        buffer = bytearray()
+        socket.readyRead.connect(lambda: buffer.extend(bytes(socket.readAll())))
+
+        def open_received():
+            buffer.extend(bytes(socket.readAll()))
+            for line in buffer.decode("utf-8").splitlines():
+                open_document(line or None)
+            socket.deleteLater()
+
+        socket.disconnected.connect(open_received)
+
+    server.newConnection.connect(accept)
+    return server
 
 
 class AppDemo(QMainWindow):
@@ -45,9 +175,11 @@ class AppDemo(QMainWindow):
 
         self.enable_ner = False
         self.path = None
-        self.last_processed_text = ""
-        self.previous_sentence_count = 0
-        self.threadpool = QThreadPool()
+        self.dirty_range = None
+        self.applying_links = False
+        self.revision = 0
+        self.link_job = None
+        self.threadpool = QThreadPool.globalInstance()
         self.filterTypes = 'Text Document (*.txt);; Python (*.py);; Markdown (*.md)'
 
         # Font
@@ -57,7 +189,15 @@ class AppDemo(QMainWindow):
         # Editor
         self.editor = LinkEditor()
         self.editor.setFont(fixedFont)
-        self.editor.textChanged.connect(self.check_for_new_sentences)
+        self.sentences = SentenceIndex(self.editor.document())
+        self.editor.textChanged.connect(self.schedule_processing)
+        self.editor.document().contentsChange.connect(self.track_dirty_range)
+
+        # Debounce: the pipeline runs once typing pauses
+        self.debounce_timer = QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.setInterval(DEBOUNCE_MS)
+        self.debounce_timer.timeout.connect(self.check_for_new_sentences)
 
         # Layout
         main_layout = QVBoxLayout()
@@ -68,6 +208,11 @@ class AppDemo(QMainWindow):
 
         # Status Bar
         self.statusBar()
+        self.model_status = QLabel(models.status)
+        self.statusBar().addPermanentWidget(self.model_status)
+        models.status_changed.connect(self.model_status.setText)
+        # Edits made while the models load are picked up once they are ready
+        models.ready_changed.connect(self.check_for_new_sentences)
 
         # Toolbars and Menus
         self.init_menus_and_toolbars()
@@ -132,7 +277,7 @@ class AppDemo(QMainWindow):
         if path:
             filename = os.path.splitext(os.path.basename(path))[0]
             update_ner_tags(filename)
-            subprocess.Popen([sys.executable, sys.argv[0], path])
+            open_document(path)
 
     def file_save(self):
         if self.path is None:
@@ -163,7 +308,8 @@ class AppDemo(QMainWindow):
                 text = f.read()
             self.editor.setPlainText(text)
             self.path = file_path
-            self.previous_sentence_count = len(re.findall(r'[.!?](?=\s)', text))
+            self.sentences.mark_processed()
+            self.dirty_range = None
             self.enable_ner = True
             self.update_title()
         except Exception as e:
@@ -176,89 +322,199 @@ class AppDemo(QMainWindow):
     def dialog_message(self, message):
         QMessageBox.critical(self, "Error", message)
 
+    def mark_dirty(self, start, end):
+        if self.dirty_range is None:
+            self.dirty_range = (start, end)
+        else:
+            self.dirty_range = (min(self.dirty_range[0], start), max(self.dirty_range[1], end))
+
+    def mark_block_dirty(self, block):
+        self.mark_dirty(block.position(), block.position() + block.length() - 1)
+
+    def track_dirty_range(self, position, removed, added):
+        # Keep one [start, end) character range covering every edit since the last pass
+        if not self.enable_ner or self.applying_links:
+            return
+        self.revision += 1
+        if self.dirty_range is not None and self.dirty_range[1] >= position:
+            start, end = self.dirty_range
+            self.dirty_range = (start, end + added - removed)
+        self.cancel_link_job()
+        self.mark_dirty(position, position + added)
+
+    def shift_dirty_range(self, start, end, length):
+        """Move the pending dirty range past an edit that replaced [start, end) with `length` characters."""
+        if self.dirty_range is None or start >= self.dirty_range[1]:
+            return
+        delta = length - (end - start)
+        dirty_start, dirty_end = self.dirty_range
+        if end <= dirty_start:
+            dirty_start += delta
+        self.dirty_range = (dirty_start, dirty_end + delta)
+
+    def schedule_processing(self):
+        if not self.enable_ner or self.applying_links:
+            return
+        self.debounce_timer.start()
+
     def check_for_new_sentences(self):
-        if not self.enable_ner:
+        if not self.enable_ner or not models.ready:
+            return
+        if self.sentences.pending():
+            position, last_lines = self.sentences.last_lines_span(4)
+            self.sentences.mark_processed()
+            self.run_ner_in_background(last_lines, position)
+        self.queue_link_job()
+
+    def queue_link_job(self):
+        """Match tags in the blocks edited since the last pass on the thread pool."""
+        if self.dirty_range is None:
+            return
+        start, end = self.dirty_range
+        self.dirty_range = None
+
+        document = self.editor.document()
+        end = min(end, document.characterCount() - 1)
+        block = document.findBlock(start)
+        last_number = document.findBlock(end).blockNumber()
+
+        # A cursor per block follows the block through later edits
+        anchors = []
+        while block.isValid() and block.blockNumber() <= last_number:
+            anchors.append((QTextCursor(block), block.text()))
+            block = block.next()
+
+        self.cancel_link_job()
+        self.link_job = LinkWorker(self.revision, anchors, get_store().snapshot())
+        self.link_job.signals.finished.connect(self.apply_link_results)
+        self.threadpool.start(self.link_job)
+
+    def cancel_link_job(self):
+        job = self.link_job
+        if job is None:
+            return
+        self.link_job = None
+        job.cancelled = True
+        self.threadpool.tryTake(job)
+        # Its blocks still need matching on the next pass
+        for anchor, _ in job.anchors:
+            self.mark_block_dirty(anchor.block())
+
+    def apply_link_results(self, job, results):
+        """Wrap the spans found by `job` in [[...]] if their blocks are unchanged."""
+        if job is not self.link_job or job.cancelled or job.revision != self.revision:
             return
-        text = self.editor.toPlainText()
-        sentence_endings = re.findall(r'[.!?](?=\s)', text)
-        current_count = len(sentence_endings)
-
-        if current_count - self.previous_sentence_count >= 4:
-            self.editor.blockSignals(True)
-            new_text = text[len(self.last_processed_text):].strip()
-            self.last_processed_text = text
-            self.previous_sentence_count = current_count
-            last_lines = self.get_last_n_lines(new_text, 4)
-            self.run_ner_in_background(last_lines)
-            self.link_widget.refresh
-            updated_text = find_and_replace_tags(text, "ner_tags.json")
-            self.editor.blockSignals(True)
-            self.editor.setPlainText(updated_text)
-            self.editor.blockSignals(False)
-            cursor = self.editor.textCursor()
-            cursor.movePosition(QTextCursor.End)
-            self.editor.setTextCursor(cursor)
-
-    def get_last_n_lines(self, text, n=4):
-        return "\n".join(text.strip().splitlines()[-n:])
-
-    def run_ner_in_background(self, text):
-        worker = NERWorker(text, self.handle_ner_results)
-        self.threadpool.start(worker)
-
-    def handle_ner_results(self, tags):
-        print("✅ NER tags extracted:", tags)
+        self.link_job = None
+
+        links = []
+        for (anchor, text), spans in zip(job.anchors, results):
+            block = anchor.block()
+            if block.text() != text:
+                self.mark_block_dirty(block)
+                continue
+            block_start = block.position()
+            links.extend((block_start + start, block_start + end, tag) for start, end, tag in spans)
+        self.insert_links(links)
+
+    def insert_links(self, links):
+        """Replace each (start, end, tag) document span, given in document order, with [[tag]]."""
+        if not links:
+            return
+        # One edit block keeps the undo stack and lets Qt move the user's cursor for us
+        cursor = QTextCursor(self.editor.document())
+        cursor.beginEditBlock()
+        self.applying_links = True
+        try:
+            # Apply back to front so earlier offsets stay valid
+            for start, end, tag in reversed(links):
+                link = f"[[{tag}]]"
+                cursor.setPosition(start)
+                cursor.setPosition(end, QTextCursor.KeepAnchor)
+                cursor.insertText(link)
+                # track_dirty_range skips our own edits, so keep the pending range in step here
+                self.shift_dirty_range(start, end, len(link))
+        finally:
+            # Change signals are delivered at endEditBlock, so clear the flag afterwards
+            cursor.endEditBlock()
+            self.applying_links = False
+
+    def get_last_n_lines(self, n=4):
+        return self.sentences.last_lines(n)
+
+    def run_ner_in_background(self, text, position=None):
+        # The anchor follows the start of the text through later edits
+        anchor = None
+        if position is not None:
+            anchor = QTextCursor(self.editor.document())
+            anchor.setPosition(position)
+        NERJob(text, self.handle_ner_results, anchor).start(get_executor())
+
+    def handle_ner_results(self, job, entities):
+        """Link the entity spans NER found, if the text they came from is unchanged."""
+        print("✅ NER entities extracted:", [e["tag"] for e in entities])
+        if not entities or job.anchor is None:
+            return
+        start = job.anchor.position()
+        cursor = QTextCursor(self.editor.document())
+        cursor.setPosition(start)
+        cursor.setPosition(min(start + len(job.text), self.editor.document().characterCount() - 1), QTextCursor.KeepAnchor)
+        if cursor.selectedText().replace("\u2029", "\n") != job.text:
+            # Edited since; the tags are in the store, so the tag matcher links them later
+            return
+        existing = [(m.start(), m.end()) for m in LINK_PATTERN.finditer(job.text)]
+        links = [
+            (start + e["start"], start + e["end"], e["tag"])
+            for e in entities
+            if not any(s < e["end"] and e["start"] < t for s, t in existing)
+        ]
+        self.insert_links(links)
 
 
 class LinkEditor(QPlainTextEdit):
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.highlighter = LinkHighlighter(self.document())
 
     def mouseReleaseEvent(self, event):
         super().mouseReleaseEvent(event)
         if event.button() != Qt.RightButton:
             return
-        cursor = self.cursorForPosition(event.pos())
-        pos = cursor.position()
-        text = self.toPlainText()
-
-        for match in re.finditer(r'\[\[([^\[\]]+)\]\]', text):
-            if match.start() <= pos < match.end():
-                tag = match.group(1).strip()
-                print(f"🖱️ Right-clicked on tag: [[{tag}]]")
-                self.open_link(tag)
-                break
+        # Only the clicked block's link spans are checked
+        tag = link_at(self.cursorForPosition(event.pos()))
+        if tag:
+            print(f"🖱️ Right-clicked on tag: [[{tag}]]")
+            self.open_link(tag)
 
     def open_link(self, tag):
-        try:
-            with open("ner_tags.json", "r") as f:
-                tags = json.load(f)
-        except Exception:
-            tags = {}
-
-        filename = tags.get(tag)
+        store = get_store()
+        filename = store.get(f"[[{tag}]]")
         if not filename:
             filename = tag
-            tags[f"[[{tag}]]"] = filename
-            with open("ner_tags.json", "w") as f:
-                json.dump(tags, f, indent=2)
+            store.set(f"[[{tag}]]", filename)
 
         full_path = f"{filename}.txt"
         if not os.path.exists(full_path):
             with open(full_path, 'w') as f:
                 f.write("")
-        subprocess.Popen([sys.executable, sys.argv[0], full_path])
+        open_document(full_path)
 
 
 class LinkEditorWidget(QWidget):
+    tags_changed = pyqtSignal(object)
+
     def __init__(self, json_path="ner_tags.json"):
         super().__init__()
         self.json_path = json_path
+        self.store = get_store()
         self.layout = QVBoxLayout(self)
 
         # Table
-        self.table = QTableWidget(0, 2)
-        self.table.setHorizontalHeaderLabels(["Alias", "Tag"])
+        self.model = TagTableModel(self)
+        self.proxy = TagFilterProxy(self)
+        self.proxy.setSourceModel(self.model)
+        self.table = QTableView()
+        self.table.setModel(self.proxy)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.layout.addWidget(self.table)
 
         # Search bar
@@ -279,75 +535,120 @@ class LinkEditorWidget(QWidget):
             btn_layout.addWidget(btn)
         self.layout.addLayout(btn_layout)
 
-        self.btn_add.clicked.connect(self.add_row)
+        self.btn_add.clicked.connect(lambda: self.add_row())
         self.btn_delete.clicked.connect(self.delete_selected)
         self.btn_save.clicked.connect(self.save_json)
 
+        # Store listeners may fire on worker threads, the signal hops back to the UI thread
+        self.tags_changed.connect(self.model.apply_changes)
+        listener = lambda changes: self.tags_changed.emit(changes)
+        self.store.subscribe(listener)
+        self.destroyed.connect(lambda: self.store.unsubscribe(listener))
+
+        # Pick up tags written by other processes
+        self.poll_timer = QTimer(self)
+        self.poll_timer.timeout.connect(self.store.refresh)
+        self.poll_timer.start(2000)
+
         self.load_json()
 
     def load_json(self):
-        self.table.setRowCount(0)
-        if not os.path.exists(self.json_path):
-            return
-        try:
-            with open(self.json_path, "r") as f:
-                for alias, tag in json.load(f).items():
-                    self.add_row(alias, tag)
-        except Exception as e:
-            print("Error loading JSON:", e)
+        self.model.sync(self.store.snapshot())
 
     def save_json(self):
-        data = {}
-        for row in range(self.table.rowCount()):
-            alias = self.table.item(row, 0).text().strip()
-            tag = self.table.item(row, 1).text().strip()
-            if alias and tag:
-                data[alias] = tag
+        data = self.model.to_dict()
         try:
-            with open(self.json_path, "w") as f:
-                json.dump(data, f, indent=2)
+            self.store.replace_all(data)
+            self.store.flush()
+            # Keep the JSON file in sync for tools that still read it
+            self.store.export_json(self.json_path)
             QMessageBox.information(self, "Saved", "Links saved successfully.")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to save: {e}")
 
     def add_row(self, alias='', tag=''):
-        row = self.table.rowCount()
-        self.table.insertRow(row)
-        self.table.setItem(row, 0, QTableWidgetItem(alias))
-        self.table.setItem(row, 1, QTableWidgetItem(tag))
+        self.model.append_rows([(alias, tag)])
 
     def delete_selected(self):
-        for index in sorted(self.table.selectionModel().selectedRows(), reverse=True):
-            self.table.removeRow(index.row())
+        rows = [self.proxy.mapToSource(index).row() for index in self.table.selectionModel().selectedRows()]
+        self.model.remove_rows(rows)
 
     def filter_rows(self):
-        query = self.search_input.text().lower()
-        for row in range(self.table.rowCount()):
-            alias = self.table.item(row, 0).text().lower()
-            tag = self.table.item(row, 1).text().lower()
-            self.table.setRowHidden(row, query not in alias and query not in tag)
+        self.proxy.set_query(self.search_input.text())
 
     def refresh(self):
+        # Only rows that differ from the store are touched, the filter follows the model
+        self.store.refresh()
         self.load_json()
-        self.filter_rows()
 
 
-class NERWorker(QRunnable):
-    def __init__(self, text, callback):
+class WorkerSignals(QObject):
+    finished = pyqtSignal(object, object)
+
+
+class LinkWorker(QRunnable):
+    """Finds tag spans in a snapshot of block texts, stamped with the document revision."""
+
+    def __init__(self, revision, anchors, tags):
         super().__init__()
-        self.text = text
-        self.callback = callback
+        # The window keeps a reference to cancel it, so Qt must not delete it
+        self.setAutoDelete(False)
+        self.revision = revision
+        self.anchors = anchors
+        self.texts = [text for _, text in anchors]
+        self.tags = tags
+        self.cancelled = False
+        self.signals = WorkerSignals()
 
     @pyqtSlot()
     def run(self):
+        from string_to_tag_matching import matcher, tokenize_for_matching
+        # The tag snapshot is the same for every block, so bring the trie up to date once per job
+        matcher.sync(self.tags.values())
+        results = []
+        for text in self.texts:
+            if self.cancelled:
+                return
+            results.append(matcher.find_spans(tokenize_for_matching(text)))
+        if not self.cancelled:
+            self.signals.finished.emit(self, results)
+
+
+class NERJob:
+    """Text sent to the inference executor, and the anchor its entities are linked at."""
+
+    def __init__(self, text, callback, anchor=None):
+        self.text = text
+        self.anchor = anchor
+        # Results reach the callback on the UI thread through a queued signal
+        self.signals = WorkerSignals()
+        self.signals.finished.connect(callback)
+
+    def start(self, executor):
         print("🧠 NER extraction starting with text:", repr(self.text))
-        tags = extract_and_append_entities(self.text)
-        self.callback(tags)
+        executor.submit(self.text).add_done_callback(self.done)
+
+    def done(self, future):
+        # Runs on an executor thread
+        from predict_ner import extract_and_append_entities
+        try:
+            entities = future.result()
+        except Exception as e:
+            print(f"❌ NER extraction failed: {e}")
+            return
+        extract_and_append_entities(self.text, entities=entities)
+        self.signals.finished.emit(self, entities)
 
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
-    file_path = sys.argv[1] if len(sys.argv) > 1 else None
-    window = AppDemo(file_path)
-    window.show()
+    paths = sys.argv[1:]
+    # One process hosts every note so the models and tag store are loaded once
+    if forward_to_running_instance(paths):
+        sys.exit(0)
+    server = listen_for_documents(app)
+    for path in paths or [None]:
+        open_document(path)
+    print(f"⏱ window shown: {time.perf_counter() - START_TIME:.2f}s")
+    QThreadPool.globalInstance().start(ModelLoader(models))
     sys.exit(app.exec_())
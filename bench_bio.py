@@ -0,0 +1,99 @@
+import argparse
+import itertools
+import os
+import random
+import re
+import time
+
+from markup_bio import markup_to_bio, nltk_tokenize
+
+WORDS = ("the of and in to was is for on as by with he at from his an were are which this be has "
+         "first new after had also their one two city river war team album season film school").split()
+ENTITIES = ["Paris", "New York City", "World War II", "Albert Einstein", "River Thames", "Manchester United"]
+
+
+def synthetic_lines(count, seed=0):
+    """Sentences of 10-40 words where about one word in eight is a [[link]]."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        words = []
+        for _ in range(rng.randint(10, 40)):
+            if rng.random() < 0.12:
+                words.append(f"[[{rng.choice(ENTITIES)}]]")
+            else:
+                words.append(rng.choice(WORDS))
+        yield " ".join(words).capitalize() + "."
+
+
+def legacy_extract(text):
+    """The character-by-character conv_to_ner_plaintext implementation, kept here for parity checks."""
+    entity_spans = []
+    clean_text = ""
+    i = 0
+    while i < len(text):
+        if text[i:i+2] == "[[":
+            end = text.find("]]", i)
+            if end == -1:
+                break
+            entity = text[i+2:end]
+            entity_spans.append((len(clean_text), len(clean_text) + len(entity)))
+            clean_text += entity
+            i = end + 2
+        else:
+            clean_text += text[i]
+            i += 1
+    token_pattern = re.compile(r'\b\w+(?:-\w+)*\b|[.,!?;]')
+    tokens = []
+    token_positions = []
+    for match in token_pattern.finditer(clean_text):
+        tokens.append(match.group())
+        token_positions.append((match.start(), match.end()))
+    labels = ["O"] * len(tokens)
+    for start, end in entity_spans:
+        began = False
+        for i, (tok_start, tok_end) in enumerate(token_positions):
+            if tok_end <= start:
+                continue
+            if tok_start >= end:
+                break
+            if tok_start >= start and tok_end <= end:
+                labels[i] = "B-ENTITY" if not began else "I-ENTITY"
+                began = True
+    return {"tokens": tokens, "labels": labels}
+
+
+def throughput(lines, convert):
+    start = time.perf_counter()
+    tokens = 0
+    for line in lines:
+        tokens += len(convert(line)["tokens"])
+    elapsed = time.perf_counter() - start
+    return len(lines) / elapsed, tokens / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput of the [[markup]] to BIO conversion")
+    parser.add_argument("--input", default="test_set.txt", help="one line of [[linked]] text per line")
+    parser.add_argument("--lines", type=int, default=2_000_000, help="lines to read, or to generate without --input")
+    parser.add_argument("--legacy-lines", type=int, default=100_000, help="lines for the legacy comparison")
+    parser.add_argument("--nltk-lines", type=int, default=100_000, help="lines for the word_tokenize variant")
+    args = parser.parse_args()
+
+    if args.input and os.path.exists(args.input):
+        with open(args.input, "r", encoding="utf-8") as f:
+            lines = [line.strip() for line in itertools.islice(f, args.lines) if line.strip()]
+    else:
+        lines = list(synthetic_lines(args.lines))
+    print(f"📄 {len(lines)} lines, {sum(map(len, lines)) / 1e6:.1f} MB")
+
+    lines_per_sec, tokens_per_sec = throughput(lines, markup_to_bio)
+    print(f"⏱ regex tokens  {lines_per_sec:,.0f} lines/s  {tokens_per_sec:,.0f} tokens/s")
+    subset = lines[:args.nltk_lines]
+    lines_per_sec, tokens_per_sec = throughput(subset, lambda line: markup_to_bio(line, tokenize=nltk_tokenize))
+    print(f"⏱ word_tokenize {lines_per_sec:,.0f} lines/s  {tokens_per_sec:,.0f} tokens/s ({len(subset)} lines)")
+
+    subset = lines[:args.legacy_lines]
+    lines_per_sec, tokens_per_sec = throughput(subset, legacy_extract)
+    print(f"⏱ legacy        {lines_per_sec:,.0f} lines/s  {tokens_per_sec:,.0f} tokens/s ({len(subset)} lines)")
+    same = sum(markup_to_bio(line) == legacy_extract(line) for line in subset)
+    print(f"🔍 identical to legacy on {same}/{len(subset)} lines ({same / len(subset):.1%})")
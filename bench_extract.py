@@ -0,0 +1,55 @@
+import argparse
+import glob
+import os
+import time
+
+import scraper
+
+SAMPLE_PAGE = (
+    '<html><head><style>p{}</style></head><body><div id="mw-content-text">'
+    '<p>A <b>Feynman diagram</b> is a pictorial representation of the expressions describing the behavior of '
+    '<a href="/wiki/Subatomic_particle">subatomic particles</a>.<sup class="reference"><a href="#c1">[1]</a></sup> '
+    'The scheme is named after <a href="/wiki/Richard_Feynman"><span>Richard Feynman</span></a>, who introduced '
+    'the diagrams in 1948.</p><table><tr><td>Infobox</td></tr></table>'
+    '<p>Feynman diagrams give a simple visualization of what would otherwise be an arcane formula in '
+    '<a href="/wiki/Quantum_field_theory">quantum field theory</a>.</p></div></body></html>'
+)
+
+
+def load_pages(html_dir, limit):
+    paths = sorted(glob.glob(os.path.join(html_dir, "*.html")))[:limit] if html_dir else []
+    pages = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            pages.append(f.read())
+    return pages or [SAMPLE_PAGE]
+
+
+def benchmark(pages, backend, repeat):
+    outputs = [scraper.extract_paragraphs(page, backend) for page in pages]  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            scraper.extract_paragraphs(page, backend)
+    return outputs, len(pages) * repeat / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pages/sec and output parity of the paragraph extraction backends")
+    parser.add_argument("--html-dir", default=".scraper_cache", help="saved pages (*.html), e.g. the scraper cache")
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    pages = load_pages(args.html_dir, args.limit)
+    print(f"📄 {len(pages)} pages, {sum(map(len, pages)) / 1e6:.1f} MB of HTML")
+
+    outputs = {}
+    speed = {}
+    for backend in ("bs4", "lxml"):
+        outputs[backend], speed[backend] = benchmark(pages, backend, args.repeat)
+        print(f"⏱ {backend:5} {speed[backend]:.1f} pages/s")
+    print(f"🚀 lxml is {speed['lxml'] / speed['bs4']:.1f}x faster")
+
+    same = sum(a == b for a, b in zip(outputs["bs4"], outputs["lxml"]))
+    print(f"🔍 identical lines on {same}/{len(pages)} pages ({same / len(pages):.1%})")
@@ -0,0 +1,69 @@
+import argparse
+import os
+import statistics
+import time
+
+import predict_ner
+
+SAMPLE_TEXTS = [
+    "Albert Einstein developed the theory of general relativity while working in Bern.",
+    "The business found a market gap in pricing software for small restaurants.",
+    "Quantum mechanics and machine learning are both popular topics in physics departments.",
+    "Richard Feynman introduced Feynman diagrams to describe the behaviour of subatomic particles.",
+]
+
+
+def load_texts(path, limit):
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+    else:
+        texts = SAMPLE_TEXTS
+    return texts[:limit]
+
+
+def entity_spans(entities):
+    return {(int(e["start"]), int(e["end"]), e["entity_group"]) for e in entities}
+
+
+def benchmark(ner_pipeline, texts, batch_size):
+    ner_pipeline(texts[:batch_size], batch_size=batch_size)  # warm-up
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        ner_pipeline(text)
+        latencies.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    results = ner_pipeline(texts, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return results, {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+        "texts_per_sec": len(texts) / elapsed,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Entity-span parity and latency/throughput of the NER backends")
+    parser.add_argument("--texts", default="test_set.txt", help="one text per line, falls back to built-in samples")
+    parser.add_argument("--limit", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--backends", nargs="+", default=["pytorch", "onnx"])
+    parser.add_argument("--onnx-file", default=predict_ner.ONNX_FILE, help="model.onnx or model_quantized.onnx")
+    args = parser.parse_args()
+
+    predict_ner.ONNX_FILE = args.onnx_file
+    texts = load_texts(args.texts, args.limit)
+    print(f"📄 {len(texts)} texts, batch size {args.batch_size}")
+
+    outputs = {}
+    for backend in args.backends:
+        outputs[backend], stats = benchmark(predict_ner.load_pipeline(backend), texts, args.batch_size)
+        print(f"⏱ {backend:8} p50 {stats['p50_ms']:.1f} ms  p95 {stats['p95_ms']:.1f} ms  {stats['texts_per_sec']:.1f} texts/s")
+
+    # Parity of every backend against the first one
+    reference = args.backends[0]
+    for backend in args.backends[1:]:
+        same = sum(entity_spans(a) == entity_spans(b) for a, b in zip(outputs[reference], outputs[backend]))
+        print(f"🔍 {backend} vs {reference}: identical entity spans on {same}/{len(texts)} texts ({same / len(texts):.1%})")
@@ -0,0 +1,109 @@
+import argparse
+import bz2
+import difflib
+import json
+import os
+import sys
+import time
+
+import mwxml
+
+from conv_to_clean_text import extract_plaintext
+
+SAMPLE_PAGES = [
+    {"title": "Sample", "text": (
+        "{{Infobox person|name=Ada Lovelace|birth_date={{birth date|1815|12|10}}}}\n"
+        "'''Augusta Ada King''' was an English [[mathematician]] and writer, chiefly known for her work "
+        "on [[Charles Babbage|Babbage's]] proposed mechanical general-purpose computer, the "
+        "[[Analytical Engine]].<ref name=\"bio\">{{cite book|title=Ada}}</ref> She was the first to "
+        "recognise that the machine had applications beyond pure calculation.<!-- citation needed -->\n"
+        "== Early life ==\n"
+        "[[File:Ada Lovelace portrait.jpg|thumb|Portrait by [[Margaret Sarah Carpenter]]]]\n"
+        "Her father was [[Lord Byron]], who left England a few months after her birth.&nbsp;\n"
+        "{| class=\"wikitable\"\n| Year || Event\n|-\n| 1843 || Notes published\n|}\n"
+        "[[Category:English mathematicians]] __NOTOC__"
+    )},
+]
+
+
+def load_pages(golden, dump, limit):
+    """
+    Pages as {"title", "text"} dicts from a JSON-lines corpus, a dump, or the built-in sample.
+    Golden corpus pages may also hold the reviewed "expected" sentences.
+    """
+    if golden and os.path.exists(golden):
+        with open(golden, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f][:limit]
+    if dump and os.path.exists(dump):
+        pages = []
+        for page in mwxml.Dump.from_file(bz2.open(dump)):
+            if page.namespace != 0:
+                continue
+            for revision in page:
+                if revision.text:
+                    pages.append({"title": page.title, "text": revision.text})
+            if len(pages) >= limit:
+                break
+        return pages[:limit]
+    return SAMPLE_PAGES
+
+
+def benchmark(pages, engine, repeat):
+    outputs = [extract_plaintext(p["text"], engine) for p in pages]  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            extract_plaintext(page["text"], engine)
+    elapsed = time.perf_counter() - start
+    return outputs, len(pages) * repeat / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pages/sec and output parity of the wikitext cleaning engines")
+    parser.add_argument("--golden", default="wikitext_golden.jsonl",
+                        help="JSON lines of {title, text, expected} pages")
+    parser.add_argument("--dump", default="enwiki-latest-pages-articles-multistream25.xml-p57025656p58525655.bz2",
+                        help="read pages from this dump when the golden corpus does not exist")
+    parser.add_argument("--save-golden", action="store_true",
+                        help="write the pages to --golden with the scanner's sentences as expected output")
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--show-diffs", type=int, default=3, help="print the sentence diff of this many pages")
+    args = parser.parse_args()
+
+    pages = load_pages(args.golden, args.dump, args.limit)
+    print(f"📄 {len(pages)} pages, {sum(len(p['text']) for p in pages) / 1e6:.1f} MB of wikitext")
+
+    outputs = {}
+    speed = {}
+    for engine in ("regex", "scanner"):
+        outputs[engine], speed[engine] = benchmark(pages, engine, args.repeat)
+        print(f"⏱ {engine:8} {speed[engine]:.1f} pages/s")
+    print(f"🚀 scanner is {speed['scanner'] / speed['regex']:.1f}x faster")
+
+    if args.save_golden:
+        # Review the saved sentences before relying on them as the expected output
+        with open(args.golden, "w", encoding="utf-8") as f:
+            for page, sentences in zip(pages, outputs["scanner"]):
+                f.write(json.dumps({"title": page["title"], "text": page["text"], "expected": sentences},
+                                   ensure_ascii=False) + "\n")
+        print(f"💾 Saved {len(pages)} pages with expected sentences to {args.golden}")
+
+    # The engines are known to differ (see scrub_wikitext), this is informational
+    same = sum(a == b for a, b in zip(outputs["regex"], outputs["scanner"]))
+    print(f"🔍 scanner and regex agree on {same}/{len(pages)} pages ({same / len(pages):.1%})")
+
+    golden = [(page, sentences) for page, sentences in zip(pages, outputs["scanner"]) if "expected" in page]
+    if golden:
+        failed = [(page["title"], page["expected"], sentences) for page, sentences in golden
+                  if sentences != page["expected"]]
+        print(f"✅ scanner matches the expected sentences on {len(golden) - len(failed)}/{len(golden)} golden pages")
+        diffs = [(title, expected, actual, "expected") for title, expected, actual in failed]
+    else:
+        diffs = [(page["title"], a, b, "regex") for page, a, b in zip(pages, outputs["regex"], outputs["scanner"]) if a != b]
+    for title, a, b, label in diffs[:args.show_diffs]:
+        print(f"\n--- {title}")
+        for line in difflib.unified_diff(a, b, label, "scanner", lineterm="", n=0):
+            print(line)
+    if golden and failed:
+        sys.exit(1)
@@ -1,23 +1,22 @@
+import argparse
 import bz2
 import re
+import xml.etree.ElementTree as ET
+from multiprocessing import Pool
 import mwparserfromhell
 import mwxml
 import nltk
 from typing import List
 
+from shard_writer import ShardWriter
+from wikitext_scrubber import scrub_wikitext
+
 # Make sure the sentence tokenizer is downloaded
 nltk.download("punkt")
 from nltk.tokenize import sent_tokenize
 
-def extract_plaintext(wikitext: str) -> List[str]:
-    """
-    Extract clean plaintext sentences from wikitext, preserving only:
-    - Natural language text
-    - Wikilinks in [[...]] format
-    """
-    if not wikitext:
-        return []
-
+def scrub_with_regex(wikitext: str) -> str:
+    """Reference cleaner: one re.sub pass per kind of markup, then mwparserfromhell for the wikilinks."""
     # First pass: remove complex wiki markup using regex
     patterns_to_remove = [
         r'\[\[Category:.*?\]\]',    # Categories
@@ -48,8 +47,26 @@ def extract_plaintext(wikitext: str) -> List[str]:
         if display_text:
             wikicode.replace(link, f"[[{display_text}]]")
 
-    # Final clean text
-    clean_text = str(wikicode)
+    return str(wikicode)
+
+def extract_plaintext(wikitext: str, engine: str = "scanner") -> List[str]:
+    """
+    Extract clean plaintext sentences from wikitext, preserving only:
+    - Natural language text
+    - Wikilinks in [[...]] format
+
+    engine="scanner" strips the markup in one pass (wikitext_scrubber),
+    engine="regex" uses the original multi-pass cleaner.
+    """
+    if not wikitext:
+        return []
+
+    if engine == "scanner":
+        clean_text = scrub_wikitext(wikitext)
+    elif engine == "regex":
+        clean_text = scrub_with_regex(wikitext)
+    else:
+        raise ValueError(f"Unknown cleaning engine: {engine}")
     clean_text = ' '.join(clean_text.split())  # Normalize whitespace
 
     try:
@@ -73,23 +90,28 @@ def extract_plaintext(wikitext: str) -> List[str]:
 
     return final_sentences
 
-def process_dump(input_file: str, output_file: str):
-    """Process the XML dump and write clean sentences to output_file."""
+def process_dump(input_file: str, writer: ShardWriter, engine: str = "scanner", checkpoint_every: int = 100):
+    """
+    Process the XML dump and write clean sentences to the writer's shards.
+    Pages finished before the writer's last checkpoint are skipped without being cleaned.
+    """
+    if writer.complete:
+        print("✅ Already complete")
+        return
     dump = mwxml.Dump.from_file(bz2.open(input_file))
 
-    with open(output_file, "w", encoding="utf-8") as f_out:
+    try:
         for i, page in enumerate(dump):
-            if page.namespace != 0:
+            if page.namespace != 0 or writer.is_done(page.id):
                 continue
 
+            sentences = []
             for revision in page:
                 if not revision.text:
                     continue
 
                 try:
-                    sentences = extract_plaintext(revision.text)
-                    for sent in sentences:
-                        f_out.write(sent + "\n")
+                    sentences.extend(extract_plaintext(revision.text, engine))
 
                     if i % 100 == 0:
                         print(f"Processed {i} pages... Last: {page.title}")
@@ -97,7 +119,92 @@ def process_dump(input_file: str, output_file: str):
                 except Exception as e:
                     print(f"Skipped page {page.id} ({page.title}): {str(e)}")
 
+            writer.write_page(page.id, sentences)
+            if writer.state["pages"] % checkpoint_every == 0:
+                writer.checkpoint()
+        writer.finish()
+    finally:
+        writer.close()
+
+def read_stream_offsets(index_file: str) -> List[int]:
+    """Start offsets of the bz2 streams listed in a multistream index (offset:page_id:title lines)."""
+    offsets = set()
+    with bz2.open(index_file, "rt", encoding="utf-8") as f:
+        for line in f:
+            offsets.add(int(line.split(":", 1)[0]))
+    return sorted(offsets)
+
+def process_stream(task):
+    """
+    Decompress one bz2 stream (about 100 pages) of a multistream dump and clean its articles.
+    Returns (page id, sentences) for every article after page `done_through`.
+    """
+    input_file, start, end, engine, done_through = task
+    with open(input_file, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start if end is not None else -1)
+    # Streams hold bare <page> elements; the last one also closes the root element
+    xml_text = bz2.decompress(data).decode("utf-8").replace("</mediawiki>", "")
+    root = ET.fromstring(f"<pages>{xml_text}</pages>")
+
+    pages = []
+    for page in root.iter("page"):
+        page_id = int(page.findtext("id"))
+        if page.findtext("ns") != "0" or (done_through is not None and page_id <= done_through):
+            continue
+        text = page.findtext("revision/text")
+        sentences = []
+        if text:
+            try:
+                sentences = extract_plaintext(text, engine)
+            except Exception as e:
+                print(f"Skipped page {page_id} ({page.findtext('title')}): {str(e)}")
+        pages.append((page_id, sentences))
+    return pages
+
+def process_dump_parallel(input_file: str, index_file: str, writer: ShardWriter, workers: int = None,
+                          engine: str = "scanner"):
+    """
+    Process a multistream dump with a pool of workers, one bz2 stream per task.
+    Results are written in stream order, so the output matches a serial run over the same streams.
+    The writer is checkpointed after every stream and a restart resumes from the last one.
+    """
+    if writer.complete:
+        print("✅ Already complete")
+        return
+    offsets = read_stream_offsets(index_file)
+    streams = list(zip(offsets, offsets[1:] + [None]))
+    if writer.stream_offset is not None:
+        streams = [(start, end) for start, end in streams if start >= writer.stream_offset]
+    tasks = [(input_file, start, end, engine, writer.last_page_id) for start, end in streams]
+    print(f"{len(tasks)} streams to process")
+
+    try:
+        with Pool(workers) as pool:
+            for i, pages in enumerate(pool.imap(process_stream, tasks)):
+                start = tasks[i][1]
+                for page_id, sentences in pages:
+                    writer.write_page(page_id, sentences, stream_offset=start)
+                writer.checkpoint()
+                if i % 10 == 0:
+                    print(f"Processed {i + 1}/{len(tasks)} streams, {writer.state['pages']} pages...")
+        writer.finish()
+    finally:
+        writer.close()
+
 if __name__ == "__main__":
-    input_file = "enwiki-latest-pages-articles-multistream25.xml-p57025656p58525655.bz2"
-    output_file = "test_set.txt"
-    process_dump(input_file, output_file)
+    parser = argparse.ArgumentParser(description="Convert a Wikipedia dump into clean sentences with [[links]]")
+    parser.add_argument("--input", default="enwiki-latest-pages-articles-multistream25.xml-p57025656p58525655.bz2")
+    parser.add_argument("--output", default="test_set", help="directory for the sentence shards and checkpoint")
+    parser.add_argument("--shard-mb", type=float, default=256, help="start a new shard after this many MB")
+    parser.add_argument("--index", default=None, help="multistream index (.txt.bz2); enables the parallel mode")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, defaults to the number of cores")
+    parser.add_argument("--engine", choices=["scanner", "regex"], default="scanner",
+                        help="markup cleaner: single-pass scanner or the original regex passes")
+    args = parser.parse_args()
+    # Rerunning with the same --output resumes after the last checkpoint
+    writer = ShardWriter(args.output, max_bytes=int(args.shard_mb * 1024 * 1024))
+    if args.index:
+        process_dump_parallel(args.input, args.index, writer, args.workers, args.engine)
+    else:
+        process_dump(args.input, writer, args.engine)
@@ -1,50 +1,23 @@
-import re
+import argparse
 import json
+import os
+from multiprocessing import Pool
+
 import nltk
-from nltk.tokenize import word_tokenize
 from tqdm import tqdm
 
+from markup_bio import markup_to_bio, nltk_tokenize
+from shard_writer import read_manifests
+
 nltk.download("punkt")
 
 def extract_entities_and_tokens(text):
-    entity_spans = []
-    clean_text = ""
-    i = 0
-
-    # Extract entities and track span positions
-    while i < len(text):
-        if text[i:i+2] == "[[":
-            end = text.find("]]", i)
-            if end == -1:
-                break
-            entity = text[i+2:end]
-            entity_spans.append((len(clean_text), len(clean_text) + len(entity)))
-            clean_text += entity
-            i = end + 2
-        else:
-            clean_text += text[i]
-            i += 1
-
-    tokens = word_tokenize(clean_text)
-    labels = ["O"] * len(tokens)
-
-    # Assign labels based on entity spans
-    offset = 0
-    for start, end in entity_spans:
-        entity_tokens = word_tokenize(clean_text[start:end])
-        for j, token in enumerate(entity_tokens):
-            try:
-                index = tokens.index(token, offset)
-                labels[index] = "B-ENTITY" if j == 0 else "I-ENTITY"
-                offset = index + 1
-            except ValueError:
-                continue
+    return markup_to_bio(text, tokenize=nltk_tokenize)
 
-    return {"tokens": tokens, "labels": labels}
-
-def process_file(input_path, output_path):
+def process_file(input_path, output_path, progress=True):
+    examples = 0
     with open(input_path, "r", encoding="utf-8") as f_in, open(output_path, "w", encoding="utf-8") as f_out:
-        for line in tqdm(f_in, desc="Generating NER dataset"):
+        for line in tqdm(f_in, desc="Generating NER dataset", disable=not progress):
             line = line.strip()
             if not line:
                 continue
@@ -53,11 +26,43 @@ def process_file(input_path, output_path):
                 if "B-ENTITY" in result["labels"]:  # only save if entities exist
                     json.dump(result, f_out)
                     f_out.write("\n")
+                    examples += 1
             except Exception as e:
                 print("Error:", e)
                 continue
+    return examples
+
+def process_shard(task):
+    shard_path, part_path = task
+    return process_file(shard_path, part_path, progress=False)
+
+def process_shards(shard_dir, output_path, workers=None):
+    """
+    Convert the finished shards of a conv_to_clean_text output directory in parallel, one shard
+    per task, and join the results into `output_path` in shard order.
+    """
+    manifests = read_manifests(shard_dir)
+    tasks = [(m["path"], f"{output_path}.part{i:05d}") for i, m in enumerate(manifests)]
+    print(f"{len(tasks)} shards, {sum(m['sentences'] for m in manifests)} sentences to process")
+    examples = 0
+    with Pool(workers) as pool, open(output_path, "w", encoding="utf-8") as f_out:
+        results = pool.imap(process_shard, tasks)
+        for (_, part_path), count in tqdm(zip(tasks, results), total=len(tasks), desc="Generating NER dataset"):
+            with open(part_path, "r", encoding="utf-8") as part:
+                for line in part:
+                    f_out.write(line)
+            os.remove(part_path)
+            examples += count
+    print(f"✅ {examples} examples written to {output_path}")
 
 if __name__ == "__main__":
-    input_file = "test_set.txt"  # file with [[wikilinks]]
-    output_file = "test_set.jsonl"
-    process_file(input_file, output_file)
+    parser = argparse.ArgumentParser(description="Turn sentences with [[wikilinks]] into a BIO-labelled NER dataset")
+    parser.add_argument("--input", default="test_set",
+                        help="conv_to_clean_text shard directory, or a single text file")
+    parser.add_argument("--output", default="test_set.jsonl")
+    parser.add_argument("--workers", type=int, default=None, help="processes for a shard directory")
+    args = parser.parse_args()
+    if os.path.isdir(args.input):
+        process_shards(args.input, args.output, args.workers)
+    else:
+        process_file(args.input, args.output)
@@ -1,76 +1,115 @@
 #BEFORE RUNNING THIS MAKE SURE ALL CHARACTERS LIKE ===== ARENT THERE AND THAT [[]] ARE SPACE SEPAPRATED FROM ADJACENT WORDS 
 
-import re
+import argparse
 import json
+from multiprocessing import Pool
 from tqdm import tqdm
 import nltk
 from nltk.tokenize import sent_tokenize
 
+from markup_bio import markup_to_bio
+
 nltk.download("punkt")
 
 def extract_entities_and_tokens(text):
-    entity_spans = []
-    clean_text = ""
-    i = 0
-
-    # Extract [[entity]] markup and build clean_text
-    while i < len(text):
-        if text[i:i+2] == "[[":
-            end = text.find("]]", i)
-            if end == -1:
-                break
-            entity = text[i+2:end]
-            entity_spans.append((len(clean_text), len(clean_text) + len(entity)))
-            clean_text += entity
-            i = end + 2
-        else:
-            clean_text += text[i]
-            i += 1
-
-    # Tokenize using regex that preserves hyphenated words
-    token_pattern = re.compile(r'\b\w+(?:-\w+)*\b|[.,!?;]')
-    tokens = []
-    token_positions = []
+    return markup_to_bio(text)
 
-    for match in token_pattern.finditer(clean_text):
-        tokens.append(match.group())
-        token_positions.append((match.start(), match.end()))
+SENTENCE_END = (".", "!", "?", '"', "'", ")")
 
-    labels = ["O"] * len(tokens)
+def iter_sentences(f, max_chars=1 << 20):
+    """
+    Sentences of a text file, tokenized one paragraph at a time.
 
-    # Assign B-ENTITY / I-ENTITY labels
-    for start, end in entity_spans:
-        began = False
-        for i, (tok_start, tok_end) in enumerate(token_positions):
-            if tok_end <= start:
+    A paragraph ends at a blank line or at a line ending in sentence
+    punctuation. Once a paragraph passes `max_chars` it is tokenized
+    anyway and only its unfinished last sentence is carried over, so the
+    buffer stays bounded.
+    """
+    buffer = []
+    size = 0
+    for line in f:
+        text = line.rstrip()
+        if text:
+            buffer.append(line)
+            size += len(line)
+            if size < max_chars and not text.endswith(SENTENCE_END):
                 continue
-            if tok_start >= end:
-                break
-            if tok_start >= start and tok_end <= end:
-                labels[i] = "B-ENTITY" if not began else "I-ENTITY"
-                began = True
+        if not buffer:
+            continue
+        sentences = sent_tokenize("".join(buffer).strip())
+        buffer = []
+        size = 0
+        # Cut by max_chars mid-paragraph: the last sentence may go on in the next line
+        if text and not text.endswith(SENTENCE_END) and sentences:
+            buffer = [sentences.pop() + "\n"]
+            size = len(buffer[0])
+        yield from sentences
+    if buffer:
+        yield from sent_tokenize("".join(buffer).strip())
 
-    return {"tokens": tokens, "labels": labels}
+def iter_chunks(sentences, size=4):
+    """Join consecutive sentences into windows of `size`, the last one possibly shorter."""
+    window = []
+    for sentence in sentences:
+        window.append(sentence)
+        if len(window) == size:
+            yield " ".join(window)
+            window = []
+    if window:
+        yield " ".join(window)
 
-def process_file(input_path, output_path):
-    with open(input_path, "r", encoding="utf-8") as f_in, open(output_path, "w", encoding="utf-8") as f_out:
-        full_text = f_in.read()
-        sentences = sent_tokenize(full_text)
+def label_chunk(chunk):
+    """BIO labels for one window, or None if it has no entity (or fails)."""
+    if not chunk.strip():
+        return None
+    try:
+        result = extract_entities_and_tokens(chunk)
+    except Exception as e:
+        print("Error:", e)
+        return None
+    return result if "B-ENTITY" in result["labels"] else None
 
-        for i in tqdm(range(0, len(sentences), 4), desc="Generating NER dataset"):
-            chunk = " ".join(sentences[i:i+4])
-            if not chunk.strip():
-                continue
-            try:
-                result = extract_entities_and_tokens(chunk)
-                if "B-ENTITY" in result["labels"]:
-                    json.dump(result, f_out)
-                    f_out.write("\n")
-            except Exception as e:
-                print("Error:", e)
-                continue
+def iter_batches(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def process_file(input_path, output_path, workers=1, batch_size=1024):
+    """
+    Stream `input_path` into 4-sentence NER examples, written as they are labelled.
+    With workers > 1 the labelling runs in a process pool, one bounded batch at a time,
+    and the output keeps the input order.
+    """
+    pool = Pool(workers) if workers > 1 else None
+    try:
+        with open(input_path, "r", encoding="utf-8") as f_in, open(output_path, "w", encoding="utf-8") as f_out:
+            chunks = iter_chunks(iter_sentences(f_in))
+            progress = tqdm(desc="Generating NER dataset", unit=" chunks")
+            for batch in iter_batches(chunks, batch_size):
+                if pool is None:
+                    results = map(label_chunk, batch)
+                else:
+                    results = pool.map(label_chunk, batch, chunksize=max(1, batch_size // (workers * 4)))
+                for result in results:
+                    if result is not None:
+                        json.dump(result, f_out)
+                        f_out.write("\n")
+                progress.update(len(batch))
+            progress.close()
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
 
 if __name__ == "__main__":
-    input_file = "/home/kaen/dir1/cleaned_paragraphs_20250406_111332.txt"
-    output_file = "train_set.jsonl"
-    process_file(input_file, output_file)
+    parser = argparse.ArgumentParser(description="Turn paragraphs with [[links]] into a BIO-labelled NER dataset")
+    parser.add_argument("--input", default="/home/kaen/dir1/cleaned_paragraphs_20250406_111332.txt")
+    parser.add_argument("--output", default="train_set.jsonl")
+    parser.add_argument("--workers", type=int, default=1, help="labelling processes")
+    args = parser.parse_args()
+    process_file(args.input, args.output, args.workers)
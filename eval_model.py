@@ -1,39 +1,25 @@
+import argparse
+
 from transformers import AutoTokenizer, AutoModelForTokenClassification
-from datasets import load_dataset
 import evaluate
 import numpy as np
 
+from ner_shards import LABEL_LIST, load_tokenized
+
+parser = argparse.ArgumentParser(description="Evaluate the NER model on a labelled JSONL set")
+parser.add_argument("--test-file", default="test_set.jsonl")
+parser.add_argument("--shards", default=None, help="directory of pre-tokenized shards, built there if missing or stale")
+cli_args = parser.parse_args()
+
 # Load model and tokenizer
 model = AutoModelForTokenClassification.from_pretrained("ner-model-final")
 tokenizer = AutoTokenizer.from_pretrained("ner-model-final")
-label_list = ["O", "B-ENTITY", "I-ENTITY"]
+label_list = LABEL_LIST
 label_to_id = {l: i for i, l in enumerate(label_list)}
 id_to_label = {i: l for l, i in label_to_id.items()}
 
-# Load dataset
-dataset = load_dataset("json", data_files="test_set.jsonl")
-
-# Preprocess
-def preprocess(example):
-    tokenized_inputs = tokenizer(
-        example["tokens"],
-        is_split_into_words=True,
-        truncation=True,
-        padding="max_length",
-        max_length=128,
-    )
-
-    word_ids = tokenized_inputs.word_ids()
-    label_ids = []
-    for word_idx in word_ids:
-        if word_idx is None:
-            label_ids.append(-100)
-        else:
-            label_ids.append(label_to_id[example["labels"][word_idx]])
-    tokenized_inputs["labels"] = label_ids
-    return tokenized_inputs
-
-tokenized_dataset = dataset.map(preprocess)
+# Load and tokenize the dataset, or memory-map shards tokenized by an earlier run
+tokenized_dataset = load_tokenized(cli_args.test_file, tokenizer, label_list, shards_dir=cli_args.shards)
 from transformers import DataCollatorForTokenClassification, Trainer, TrainingArguments
 
 metric = evaluate.load("seqeval")
@@ -60,7 +46,7 @@ trainer = Trainer(
     model=model,
     tokenizer=tokenizer,
     args=args,
-    eval_dataset=tokenized_dataset["train"],
+    eval_dataset=tokenized_dataset,
     data_collator=DataCollatorForTokenClassification(tokenizer),
     compute_metrics=compute_metrics,
 )
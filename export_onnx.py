@@ -0,0 +1,30 @@
+import argparse
+import os
+
+from optimum.onnxruntime import ORTModelForTokenClassification, ORTQuantizer
+from optimum.onnxruntime.configuration import AutoQuantizationConfig
+from transformers import AutoTokenizer
+
+
+def export(model_dir, output_dir, quantize=False):
+    """Export a trained token-classification model to ONNX, optionally with a dynamic int8 copy."""
+    model = ORTModelForTokenClassification.from_pretrained(model_dir, export=True)
+    model.save_pretrained(output_dir)
+    AutoTokenizer.from_pretrained(model_dir).save_pretrained(output_dir)
+    print(f"✅ Exported ONNX model to {output_dir}")
+
+    if quantize:
+        # Dynamic quantization: int8 weights, activations quantized at run time, no calibration data
+        quantizer = ORTQuantizer.from_pretrained(output_dir, file_name="model.onnx")
+        qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=output_dir, quantization_config=qconfig)
+        print(f"✅ Wrote int8 model to {os.path.join(output_dir, 'model_quantized.onnx')}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the NER model to ONNX for predict_ner's onnx backend")
+    parser.add_argument("--model", default="./final_3", help="trained model directory (train_ner.py output)")
+    parser.add_argument("--output", default=None, help="defaults to <model>_onnx")
+    parser.add_argument("--quantize", action="store_true", help="also write a dynamic int8 model_quantized.onnx")
+    args = parser.parse_args()
+    export(args.model, args.output or args.model.rstrip("/\\") + "_onnx", args.quantize)
@@ -0,0 +1,89 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# "thread" runs inference in this process, "process" in a pool of worker processes
+EXECUTOR_MODE = os.environ.get("NER_EXECUTOR", "thread")
+EXECUTOR_WORKERS = int(os.environ.get("NER_WORKERS", "1"))
+# torch/OpenMP threads per worker, 0 splits the cores left after the UI thread
+EXECUTOR_THREADS = int(os.environ.get("NER_THREADS", "0"))
+
+
+def thread_budget(workers):
+    """Cores per worker, keeping one core free for the UI."""
+    return max(1, ((os.cpu_count() or 2) - 1) // max(1, workers))
+
+
+def limit_threads(threads):
+    """Cap the intra-op thread pools of torch and the OpenMP/MKL runtimes for this process."""
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    import torch
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Only allowed before the first parallel op in the process
+        pass
+
+
+def _extract_entities(text):
+    from predict_ner import extract_entities
+    return extract_entities(text)
+
+
+def _warm_up():
+    from predict_ner import load_pipeline
+    load_pipeline()
+    return os.getpid()
+
+
+class InferenceExecutor:
+    """
+    Runs extract_entities either on a thread of this process or in worker
+    processes, each with an explicit torch/OpenMP thread limit. Process mode
+    keeps inference off the GUI process's GIL and cores entirely.
+    """
+
+    def __init__(self, mode=EXECUTOR_MODE, workers=EXECUTOR_WORKERS, threads=EXECUTOR_THREADS):
+        self.mode = mode
+        self.workers = workers
+        self.threads = threads or thread_budget(workers)
+        if mode == "process":
+            # spawn: forking a process that runs Qt threads is not safe
+            self.pool = ProcessPoolExecutor(
+                workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=limit_threads,
+                initargs=(self.threads,),
+            )
+        elif mode == "thread":
+            limit_threads(self.threads)
+            self.pool = ThreadPoolExecutor(workers, thread_name_prefix="ner")
+        else:
+            raise ValueError(f"Unknown executor mode: {mode}")
+
+    def submit(self, text):
+        """Return a Future for the entities of `text`."""
+        return self.pool.submit(_extract_entities, text)
+
+    def warm_up(self):
+        """Load the model in the workers before the first request needs it."""
+        futures = [self.pool.submit(_warm_up) for _ in range(self.workers)]
+        return sorted({f.result() for f in futures})
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    """Return the process-wide InferenceExecutor, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = InferenceExecutor()
+        return _executor
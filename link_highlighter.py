@@ -0,0 +1,48 @@
+import re
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QSyntaxHighlighter, QTextBlockUserData, QTextCharFormat
+
+LINK_PATTERN = re.compile(r'\[\[([^\[\]]+)\]\]')
+
+
+class LinkSpans(QTextBlockUserData):
+    """(start, end, tag) spans of the [[links]] in one block, offsets relative to the block."""
+
+    def __init__(self, spans):
+        super().__init__()
+        self.spans = spans
+
+
+class LinkHighlighter(QSyntaxHighlighter):
+    """
+    Highlights [[links]] and records their spans on each block.
+
+    Qt only re-runs highlightBlock for blocks that changed, so the per-block
+    span index stays current without any whole-document pass.
+    """
+
+    def __init__(self, document):
+        super().__init__(document)
+        self.link_format = QTextCharFormat()
+        self.link_format.setForeground(Qt.blue)
+        self.link_format.setFontUnderline(True)
+
+    def highlightBlock(self, text):
+        spans = []
+        for match in LINK_PATTERN.finditer(text):
+            spans.append((match.start(), match.end(), match.group(1).strip()))
+            self.setFormat(match.start(), match.end() - match.start(), self.link_format)
+        self.setCurrentBlockUserData(LinkSpans(spans))
+
+
+def link_at(cursor):
+    """Return the tag of the [[link]] under `cursor`, or None."""
+    data = cursor.block().userData()
+    if not isinstance(data, LinkSpans):
+        return None
+    pos = cursor.positionInBlock()
+    for start, end, tag in data.spans:
+        if start <= pos < end:
+            return tag
+    return None
@@ -0,0 +1,92 @@
+import re
+
+from nltk.tokenize import word_tokenize
+
+# Words, keeping hyphenated words together, and sentence punctuation
+TOKEN_PATTERN = re.compile(r'\b\w+(?:-\w+)*\b|[.,!?;]')
+
+# word_tokenize rewrites double quotes, so these tokens are looked up as '"' in the text
+_QUOTE_TOKENS = {"``", "''"}
+
+
+def strip_links(text):
+    """
+    Remove [[...]] markup in one pass.
+
+    Returns the clean text and the (start, end) character span of every
+    link in it. Text after an unclosed "[[" is dropped.
+    """
+    pieces = []
+    spans = []
+    length = 0
+    i = 0
+    while True:
+        start = text.find("[[", i)
+        if start < 0:
+            pieces.append(text[i:])
+            break
+        end = text.find("]]", start)
+        if end < 0:
+            pieces.append(text[i:start])
+            break
+        before = text[i:start]
+        entity = text[start + 2:end]
+        pieces.append(before)
+        pieces.append(entity)
+        length += len(before)
+        spans.append((length, length + len(entity)))
+        length += len(entity)
+        i = end + 2
+    return "".join(pieces), spans
+
+
+def regex_tokenize(text):
+    """(token, start, end) for every TOKEN_PATTERN match."""
+    return [(m.group(), m.start(), m.end()) for m in TOKEN_PATTERN.finditer(text)]
+
+
+def nltk_tokenize(text):
+    """(token, start, end) for word_tokenize, found by scanning forward through the text."""
+    tokens = []
+    offset = 0
+    for token in word_tokenize(text):
+        needle = '"' if token in _QUOTE_TOKENS else token
+        start = text.find(needle, offset)
+        if start < 0 and needle != token:
+            needle = token
+            start = text.find(needle, offset)
+        if start < 0:
+            # Normalized beyond recognition; give it an empty span so it stays "O"
+            tokens.append((token, offset, offset))
+            continue
+        offset = start + len(needle)
+        tokens.append((token, start, offset))
+    return tokens
+
+
+def bio_labels(tokens, spans):
+    """
+    Label tokens B-ENTITY/I-ENTITY when they lie inside an entity span, "O" otherwise.
+    Tokens and spans are both in text order, so one merged walk visits each once.
+    """
+    labels = ["O"] * len(tokens)
+    s = 0
+    began = False
+    for i, (_, tok_start, tok_end) in enumerate(tokens):
+        while s < len(spans) and spans[s][1] <= tok_start:
+            s += 1
+            began = False
+        if s == len(spans):
+            break
+        span_start, span_end = spans[s]
+        if span_start <= tok_start and tok_end <= span_end and tok_start < tok_end:
+            labels[i] = "I-ENTITY" if began else "B-ENTITY"
+            began = True
+    return labels
+
+
+def markup_to_bio(text, tokenize=regex_tokenize):
+    """Turn a line with [[entity]] markup into {"tokens": [...], "labels": [...]} in linear time."""
+    clean_text, spans = strip_links(text)
+    tokens = tokenize(clean_text)
+    return {"tokens": [t for t, _, _ in tokens], "labels": bio_labels(tokens, spans)}
@@ -0,0 +1,75 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+class NERCache:
+    """
+    Entity results keyed by a hash of (model version, sentence).
+
+    An in-memory LRU sits in front of an optional SQLite file, so sentences
+    seen in an earlier session can skip inference too. Changing the model
+    changes the version and therefore every key.
+    """
+
+    def __init__(self, max_entries=10000, db_path=None):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.conn = None
+        if db_path:
+            self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS ner_cache (key TEXT PRIMARY KEY, entities TEXT NOT NULL)")
+
+    @staticmethod
+    def key(version, sentence):
+        return hashlib.sha1(f"{version}\0{sentence}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            entities = self.entries.get(key)
+            if entities is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entities
+            if self.conn is not None:
+                row = self.conn.execute("SELECT entities FROM ner_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    entities = json.loads(row[0])
+                    self._remember(key, entities)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return entities
+            self.misses += 1
+            return None
+
+    def put_many(self, items):
+        with self.lock:
+            for key, entities in items:
+                self._remember(key, entities)
+            if self.conn is not None and items:
+                self.conn.executemany("INSERT OR REPLACE INTO ner_cache (key, entities) VALUES (?, ?)",
+                                      [(key, json.dumps(entities)) for key, entities in items])
+
+    def _remember(self, key, entities):
+        self.entries[key] = entities
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self.entries),
+            }
@@ -0,0 +1,143 @@
+import argparse
+import json
+import os
+import queue
+import socketserver
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+from predict_ner import SERVER_SOCKET, load_pipeline, to_json_entities
+
+
+class MicroBatcher:
+    """
+    Groups texts submitted from many connections into dynamic batches.
+
+    A batch is run as soon as it holds `max_batch_size` texts or the oldest
+    text has waited `max_wait` seconds, whichever comes first.
+    """
+
+    def __init__(self, ner_pipeline, max_batch_size=16, max_wait=0.01):
+        self.ner_pipeline = ner_pipeline
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.queue = queue.Queue()
+        self.batch_sizes = Counter()
+        self.texts_done = 0
+        self.busy_seconds = 0.0
+        self.started = time.time()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, text):
+        future = Future()
+        self.queue.put((text, future))
+        return future
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self.run_batch(batch)
+
+    def run_batch(self, batch):
+        texts = [text for text, _ in batch]
+        start = time.perf_counter()
+        try:
+            results = self.ner_pipeline(texts, batch_size=len(texts))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.busy_seconds += time.perf_counter() - start
+        self.batch_sizes[len(batch)] += 1
+        self.texts_done += len(batch)
+        for (_, future), entities in zip(batch, results):
+            future.set_result(to_json_entities(entities))
+
+    def stats(self):
+        batches = sum(self.batch_sizes.values())
+        return {
+            "queue_depth": self.queue.qsize(),
+            "batches": batches,
+            "texts": self.texts_done,
+            "mean_batch_size": self.texts_done / batches if batches else 0.0,
+            "batch_sizes": {str(size): count for size, count in sorted(self.batch_sizes.items())},
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "uptime_seconds": round(time.time() - self.started, 3),
+        }
+
+
+class NERRequestHandler(socketserver.StreamRequestHandler):
+    """Newline-delimited JSON: {"op": "ner", "texts": [...]} or {"op": "stats"}."""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                op = request.get("op", "ner")
+                if op == "ner":
+                    futures = [self.server.batcher.submit(t) for t in request["texts"]]
+                    reply = {"entities": [f.result() for f in futures]}
+                elif op in ("stats", "health"):
+                    reply = {"status": "ok", **self.server.batcher.stats()}
+                else:
+                    reply = {"error": f"unknown op {op!r}"}
+            except Exception as e:
+                reply = {"error": str(e)}
+            self.wfile.write((json.dumps(reply) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+
+class NERServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, batcher):
+        self.batcher = batcher
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        super().__init__(socket_path, NERRequestHandler)
+
+
+def print_stats(socket_path):
+    import socket
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.connect(socket_path)
+        conn.sendall(b'{"op": "stats"}\n')
+        with conn.makefile("r", encoding="utf-8") as reader:
+            print(json.dumps(json.loads(reader.readline()), indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local NER inference daemon with dynamic batching")
+    parser.add_argument("--socket", default=SERVER_SOCKET)
+    parser.add_argument("--max-batch-size", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    parser.add_argument("--stats", action="store_true", help="print the stats of a running server and exit")
+    args = parser.parse_args()
+
+    if args.stats:
+        print_stats(args.socket)
+    else:
+        batcher = MicroBatcher(load_pipeline(), args.max_batch_size, args.max_wait_ms / 1000)
+        server = NERServer(args.socket, batcher)
+        print(f"🧠 NER server listening on {args.socket}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            os.remove(args.socket)
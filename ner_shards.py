@@ -0,0 +1,138 @@
+import argparse
+import hashlib
+import json
+import os
+
+from datasets import load_dataset, load_from_disk
+
+LABEL_LIST = ["O", "B-ENTITY", "I-ENTITY"]
+MAX_LENGTH = 128
+META_FILE = "ner_shards.json"
+
+
+def tokenizer_fingerprint(tokenizer, label_list=LABEL_LIST, max_length=MAX_LENGTH):
+    """Hash of everything that decides the shard contents: vocabulary and settings, labels, max_length."""
+    digest = hashlib.sha1()
+    if getattr(tokenizer, "is_fast", False):
+        digest.update(tokenizer.backend_tokenizer.to_str().encode("utf-8"))
+    else:
+        digest.update(json.dumps(sorted(tokenizer.get_vocab().items())).encode("utf-8"))
+    digest.update(json.dumps({
+        "class": type(tokenizer).__name__,
+        "special_tokens": tokenizer.all_special_tokens,
+        "labels": list(label_list),
+        "max_length": max_length,
+    }).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def source_version(paths):
+    """Size and mtime of the JSONL files, so edited sources are re-tokenized."""
+    return [f"{os.path.basename(p)}:{os.path.getsize(p)}:{os.stat(p).st_mtime_ns}" for p in paths]
+
+
+def preprocess_batch(batch, tokenizer, label_to_id, max_length=MAX_LENGTH):
+    """Tokenize pre-split words and give every subword the label of its word (-100 for special tokens)."""
+    tokenized_inputs = tokenizer(
+        batch["tokens"],
+        is_split_into_words=True,
+        truncation=True,
+        padding="max_length",
+        max_length=max_length,
+    )
+    all_label_ids = []
+    for i, labels in enumerate(batch["labels"]):
+        label_ids = []
+        for word_idx in tokenized_inputs.word_ids(i):
+            if word_idx is None:
+                label_ids.append(-100)
+            else:
+                label_ids.append(label_to_id[labels[word_idx]])
+        all_label_ids.append(label_ids)
+    tokenized_inputs["labels"] = all_label_ids
+    return tokenized_inputs
+
+
+def tokenize_jsonl(paths, tokenizer, label_list=LABEL_LIST, max_length=MAX_LENGTH, num_proc=None):
+    """The converters' JSONL output as a tokenized Dataset with input_ids, attention_mask and label ids."""
+    dataset = load_dataset("json", data_files=paths)["train"]
+    label_to_id = {l: i for i, l in enumerate(label_list)}
+    return dataset.map(
+        preprocess_batch,
+        batched=True,
+        num_proc=num_proc,
+        remove_columns=dataset.column_names,
+        fn_kwargs={"tokenizer": tokenizer, "label_to_id": label_to_id, "max_length": max_length},
+    )
+
+
+def write_shards(paths, out_dir, tokenizer, label_list=LABEL_LIST, max_length=MAX_LENGTH,
+                 max_shard_size="500MB", num_proc=None):
+    """Tokenize `paths` once and save the result as Arrow shards plus a fingerprint file."""
+    paths = [paths] if isinstance(paths, str) else list(paths)
+    dataset = tokenize_jsonl(paths, tokenizer, label_list, max_length, num_proc)
+    dataset.save_to_disk(out_dir, max_shard_size=max_shard_size, num_proc=num_proc)
+    with open(os.path.join(out_dir, META_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "fingerprint": tokenizer_fingerprint(tokenizer, label_list, max_length),
+            "tokenizer": tokenizer.name_or_path,
+            "labels": list(label_list),
+            "max_length": max_length,
+            "sources": source_version(paths),
+            "examples": len(dataset),
+        }, f, indent=2)
+    print(f"💾 Saved {len(dataset)} tokenized examples to {out_dir}")
+    return dataset
+
+
+def read_meta(out_dir):
+    path = os.path.join(out_dir, META_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_shards(out_dir, tokenizer, label_list=LABEL_LIST, max_length=MAX_LENGTH):
+    """Memory-map the shards in `out_dir`. Raises ValueError if they were built for another tokenizer or label list."""
+    meta = read_meta(out_dir)
+    if meta is None:
+        raise ValueError(f"{out_dir} has no {META_FILE}, build it with ner_shards.py")
+    if meta["fingerprint"] != tokenizer_fingerprint(tokenizer, label_list, max_length):
+        raise ValueError(f"{out_dir} was tokenized with {meta['tokenizer']} and labels {meta['labels']}, "
+                         f"not the current tokenizer and labels")
+    return load_from_disk(out_dir)
+
+
+def load_tokenized(paths, tokenizer, label_list=LABEL_LIST, max_length=MAX_LENGTH, shards_dir=None):
+    """
+    Tokenized dataset for the JSONL `paths`. With `shards_dir`, reuse the shards there when
+    their fingerprint and sources still match and (re)build them otherwise.
+    """
+    paths = [paths] if isinstance(paths, str) else list(paths)
+    if shards_dir is None:
+        return tokenize_jsonl(paths, tokenizer, label_list, max_length)
+    meta = read_meta(shards_dir)
+    if (meta is not None and meta["sources"] == source_version(paths)
+            and meta["fingerprint"] == tokenizer_fingerprint(tokenizer, label_list, max_length)):
+        print(f"📂 Using pre-tokenized shards in {shards_dir}")
+        return load_from_disk(shards_dir)
+    print(f"🔄 Tokenizing {', '.join(paths)} into {shards_dir}")
+    write_shards(paths, shards_dir, tokenizer, label_list, max_length)
+    return load_from_disk(shards_dir)
+
+
+if __name__ == "__main__":
+    from transformers import AutoTokenizer
+
+    parser = argparse.ArgumentParser(description="Pre-tokenize converter JSONL into memory-mappable Arrow shards")
+    parser.add_argument("--input", nargs="+", default=["train_set.jsonl"])
+    parser.add_argument("--output", default="train_set_tokenized")
+    parser.add_argument("--tokenizer", default="ner-model-final", help="model directory or hub name")
+    parser.add_argument("--max-length", type=int, default=MAX_LENGTH)
+    parser.add_argument("--max-shard-size", default="500MB")
+    parser.add_argument("--num-proc", type=int, default=None)
+    args = parser.parse_args()
+
+    write_shards(args.input, args.output, AutoTokenizer.from_pretrained(args.tokenizer),
+                 max_length=args.max_length, max_shard_size=args.max_shard_size, num_proc=args.num_proc)
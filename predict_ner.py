@@ -1,37 +1,293 @@
 from transformers import AutoTokenizer, AutoModelForTokenClassification
 import torch
+import hashlib
 import json
+import os
+import re
+import socket
+import tempfile
+import threading
+
+from ner_cache import NERCache
+from tag_store import get_store
 
 model_path = r"C:\Users\samar\Notepad_GUI\final_3"
-tokenizer = AutoTokenizer.from_pretrained(model_path)
-model = AutoModelForTokenClassification.from_pretrained(model_path)
-model.eval()  # set model to evaluation mode
+# ONNX export of model_path, written by export_onnx.py
+onnx_model_path = model_path + "_onnx"
 from transformers import pipeline
 
-ner_pipeline = pipeline("token-classification", model=model, tokenizer=tokenizer, aggregation_strategy="simple")
+# "pytorch" or "onnx"; NER_ONNX_FILE=model_quantized.onnx selects the int8 export
+NER_BACKEND = os.environ.get("NER_BACKEND", "pytorch")
+ONNX_FILE = os.environ.get("NER_ONNX_FILE", "model.onnx")
+
+# Socket of the optional inference daemon (ner_server.py)
+SERVER_SOCKET = os.environ.get("NER_SOCKET", os.path.join(tempfile.gettempdir(), "notepadx-ner.sock"))
+
+ner_pipeline = None
+_pipelines = {}
+_pipeline_lock = threading.Lock()
+
+# Sentence-level result cache; NER_CACHE_DB adds an on-disk store shared across sessions
+ner_cache = NERCache(db_path=os.environ.get("NER_CACHE_DB"))
+_model_versions = {}
+
+def load_pipeline(backend=None):
+    """Load the token-classification pipeline for `backend` once, on first use."""
+    global ner_pipeline
+    backend = backend or NER_BACKEND
+    with _pipeline_lock:
+        if backend not in _pipelines:
+            if backend == "onnx":
+                from optimum.onnxruntime import ORTModelForTokenClassification
+                tokenizer = AutoTokenizer.from_pretrained(onnx_model_path)
+                model = ORTModelForTokenClassification.from_pretrained(onnx_model_path, file_name=ONNX_FILE)
+            elif backend == "pytorch":
+                tokenizer = AutoTokenizer.from_pretrained(model_path)
+                model = AutoModelForTokenClassification.from_pretrained(model_path)
+                model.eval()  # set model to evaluation mode
+            else:
+                raise ValueError(f"Unknown NER backend: {backend}")
+            _pipelines[backend] = pipeline("token-classification", model=model, tokenizer=tokenizer, aggregation_strategy="simple")
+        if backend == NER_BACKEND:
+            ner_pipeline = _pipelines[backend]
+    return _pipelines[backend]
+
+def model_version(backend=None):
+    """Fingerprint of the model files behind `backend`, part of every cache key."""
+    backend = backend or NER_BACKEND
+    if backend not in _model_versions:
+        path = onnx_model_path if backend == "onnx" else model_path
+        parts = [backend, path, ONNX_FILE if backend == "onnx" else ""]
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                stat = os.stat(os.path.join(path, name))
+                parts.append(f"{name}:{stat.st_size}:{stat.st_mtime_ns}")
+        _model_versions[backend] = hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+    return _model_versions[backend]
+
+def split_sentence_spans(text):
+    """(start, end) of each sentence in `text`, split after . ! or ? followed by whitespace."""
+    spans = []
+    start = 0
+    for match in re.finditer(r'(?<=[.!?])\s+', text):
+        spans.append((start, match.start()))
+        start = match.end()
+    if start < len(text):
+        spans.append((start, len(text)))
+    return spans
+
+def to_json_entities(entities):
+    """Make pipeline output JSON-serializable (scores come back as numpy floats)."""
+    return [
+        {"entity_group": e["entity_group"], "score": float(e["score"]), "word": e["word"],
+         "start": int(e["start"]), "end": int(e["end"])}
+        for e in entities
+    ]
+
+def _request_server(payload, timeout):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.settimeout(timeout)
+        conn.connect(SERVER_SOCKET)
+        conn.sendall((json.dumps(payload) + "\n").encode("utf-8"))
+        with conn.makefile("r", encoding="utf-8") as reader:
+            return json.loads(reader.readline())
+
+def server_available(timeout=1.0):
+    """True if the inference daemon is running and answers a health check."""
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(SERVER_SOCKET):
+        return False
+    try:
+        return _request_server({"op": "health"}, timeout).get("status") == "ok"
+    except (OSError, ValueError):
+        return False
+
+def query_server(texts, timeout=30.0):
+    """Run `texts` through the inference daemon. Returns None if it is not running."""
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(SERVER_SOCKET):
+        return None
+    try:
+        reply = _request_server({"op": "ner", "texts": texts}, timeout)
+    except (OSError, ValueError) as e:
+        print(f"❌ NER server unavailable, running locally: {e}")
+        return None
+    if "error" in reply:
+        print(f"❌ NER server error, running locally: {reply['error']}")
+        return None
+    return reply["entities"]
+
+def _infer(texts):
+    results = query_server(texts)
+    if results is None:
+        results = [to_json_entities(e) for e in load_pipeline()(texts)]
+    return results
+
+def run_ner(texts):
+    """
+    Return the pipeline entities for each text, through the daemon when one is running.
+    Texts are split into sentences and only sentences missing from ner_cache are inferred.
+    """
+    version = model_version()
+    pieces = []  # (text index, offset, cache key)
+    found = {}
+    missing = {}
+    for i, text in enumerate(texts):
+        for start, end in split_sentence_spans(text):
+            key = ner_cache.key(version, text[start:end])
+            pieces.append((i, start, key))
+            if key not in found and key not in missing:
+                entities = ner_cache.get(key)
+                if entities is None:
+                    missing[key] = text[start:end]
+                else:
+                    found[key] = entities
 
-def extract_and_append_entities(text, json_path="ner_tags.json"):
-    entities = ner_pipeline(text)
-    tag = ""
-    tags = []
+    if missing:
+        keys = list(missing)
+        inferred = list(zip(keys, _infer([missing[k] for k in keys])))
+        ner_cache.put_many(inferred)
+        found.update(inferred)
+
+    results = [[] for _ in texts]
+    for i, offset, key in pieces:
+        for entity in found[key]:
+            results[i].append({**entity, "start": entity["start"] + offset, "end": entity["end"] + offset})
+    return results
+
+def ner_document(text, max_length=128, stride=32, batch_size=16, backend=None):
+    """
+    Run NER over a whole document in overlapping windows of `max_length` tokens.
+
+    Windows overlap by `stride` tokens and run in batches. Each token takes
+    its label from the window where it sits furthest from the edges, and
+    entities are rebuilt from character offsets, so an entity cut by a
+    window boundary comes back whole. Returns entities in pipeline format,
+    plus the number of tokens the windows held, as ner_batch does.
+    """
+    ner = load_pipeline(backend)
+    tokenizer, model = ner.tokenizer, ner.model
+    id2label = model.config.id2label
+    encoded = tokenizer(
+        text,
+        max_length=max_length,
+        stride=stride,
+        truncation=True,
+        padding=True,
+        return_overflowing_tokens=True,
+        return_offsets_mapping=True,
+        return_tensors="pt",
+    )
+    offsets = encoded.pop("offset_mapping").tolist()
+    encoded.pop("overflow_to_sample_mapping", None)
+    windows = len(offsets)
+    token_count = int(encoded["attention_mask"].sum())
+
+    best = {}  # char start -> (distance from window centre, end, word id, label, score)
+    with torch.no_grad():
+        for first in range(0, windows, batch_size):
+            batch = {k: v[first:first + batch_size] for k, v in encoded.items()}
+            scores, label_ids = torch.softmax(model(**batch).logits, dim=-1).max(dim=-1)
+            for w in range(first, min(first + batch_size, windows)):
+                word_ids = encoded.word_ids(w)
+                positions = [p for p, word_id in enumerate(word_ids) if word_id is not None]
+                if not positions:
+                    continue
+                centre = (positions[0] + positions[-1]) / 2
+                for p in positions:
+                    start, end = offsets[w][p]
+                    distance = abs(p - centre)
+                    if start not in best or distance < best[start][0]:
+                        label = id2label[int(label_ids[w - first][p])]
+                        best[start] = (distance, end, word_ids[p], label, float(scores[w - first][p]))
+
+    return _group_tokens(text, [(start,) + best[start][1:] for start in sorted(best)]), token_count
+
+def _group_tokens(text, tokens):
+    """Pipeline-format entities from (start, end, word id, label, score) tokens in text order."""
+    entities = []
+    current = None  # [start, end, group, scores]
+    previous_word = None
+    for start, end, word_id, label, score in tokens:
+        prefix, _, group = label.partition("-")
+        # Subword pieces always belong to the entity of their word
+        continues_word = current is not None and word_id == previous_word
+        if label == "O" and not continues_word:
+            current = None
+        elif current is not None and (continues_word or (prefix == "I" and group == current[2])):
+            current[1] = end
+            current[3].append(score)
+        else:
+            current = [start, end, group or label, [score]]
+            entities.append(current)
+        previous_word = word_id
+    return [
+        {"entity_group": group, "score": sum(s) / len(s), "word": text[start:end], "start": start, "end": end}
+        for start, end, group, s in entities
+    ]
+
+def ner_batch(texts, max_length=512, backend=None):
+    """
+    Run NER over short `texts` (sentences) as one padded batch.
+
+    Returns the entities of each text in pipeline format, plus the number
+    of tokens the batch held, taken from the same tokenization.
+    """
+    ner = load_pipeline(backend)
+    tokenizer, model = ner.tokenizer, ner.model
+    id2label = model.config.id2label
+    encoded = tokenizer(
+        texts,
+        max_length=max_length,
+        truncation=True,
+        padding=True,
+        return_offsets_mapping=True,
+        return_tensors="pt",
+    )
+    offsets = encoded.pop("offset_mapping").tolist()
+    token_count = int(encoded["attention_mask"].sum())
+    with torch.no_grad():
+        scores, label_ids = torch.softmax(model(**encoded).logits, dim=-1).max(dim=-1)
+
+    results = []
+    for i, text in enumerate(texts):
+        word_ids = encoded.word_ids(i)
+        tokens = [
+            (offsets[i][p][0], offsets[i][p][1], word_id, id2label[int(label_ids[i][p])], float(scores[i][p]))
+            for p, word_id in enumerate(word_ids) if word_id is not None
+        ]
+        results.append(_group_tokens(text, tokens))
+    return results, token_count
+
+def merge_entity_offsets(text, entities):
+    """
+    Pipeline `entities` for `text` as dicts with start/end character offsets, score and tag.
+    "##" subword pieces extend the entity before them, so the offsets cover whole words, and
+    the tag is the slice of `text` they cover: original casing, whitespace collapsed.
+    """
+    merged = []
     for entity in entities:
-        word = entity['word']
-        if word.startswith("##"):
-            tag = tag + word[2:]
+        if entity["word"].startswith("##") and merged:
+            merged[-1]["end"] = entity["end"]
+            merged[-1]["scores"].append(entity["score"])
         else:
-            if tag: 
-                tags.append(tag)
-            tag = word
-    tags.append(tag)
-    tag_dict = {f"[[{tag}]]": tag for tag in tags if tag.strip()}
-    try:
-        with open(json_path, "r", encoding="utf-8") as f:
-            existing_data = json.load(f)
-    except FileNotFoundError:
-        existing_data = {}
-    # Update and save
-    existing_data.update(tag_dict)
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(existing_data, f, indent=2, ensure_ascii=False)
+            merged.append({"start": entity["start"], "end": entity["end"], "scores": [entity["score"]]})
+    results = []
+    for entity in merged:
+        tag = " ".join(text[entity["start"]:entity["end"]].split())
+        if tag:
+            scores = entity["scores"]
+            results.append({"start": entity["start"], "end": entity["end"], "score": sum(scores) / len(scores), "tag": tag})
+    return results
+
+def extract_entities(text):
+    """Entities in `text` with offsets, score and tag, as built by merge_entity_offsets."""
+    return merge_entity_offsets(text, run_ner([text])[0])
+
+def extract_and_append_entities(text, store=None, entities=None):
+    """Add the tags found in `text` to the store. Pass `entities` to reuse an extract_entities result."""
+    if entities is None:
+        entities = extract_entities(text)
+    tag_dict = {f"[[{e['tag']}]]": e["tag"] for e in entities}
+    # Only new or changed aliases are written, in the store's next batch
+    (store or get_store()).update(tag_dict)
     print("🏷 Extracted and saved tags:", tag_dict)
     return tag_dict
@@ -0,0 +1,100 @@
+import re
+
+from PyQt5.QtGui import QTextCursor
+
+SENTENCE_END = re.compile(r'[.!?](?=\s)')
+
+
+class SentenceIndex:
+    """
+    Sentence-ending count per QTextBlock, kept in step with the document.
+
+    Only the blocks touched by each contentsChange are rescanned, so the
+    running total and the number of sentences since the last processed
+    position are O(1) to read no matter how long the note is.
+    """
+
+    def __init__(self, document):
+        self.document = document
+        self.counts = []
+        self.total = 0
+        self.processed = 0
+        # Marks where the last processed text ended, Qt moves it with later edits
+        self.processed_cursor = QTextCursor(document)
+        self.processed_cursor.setKeepPositionOnInsert(True)
+        self.rebuild()
+        document.contentsChange.connect(self.update)
+
+    def count_block(self, block):
+        text = block.text()
+        count = len(SENTENCE_END.findall(text))
+        # The paragraph separator counts as whitespace, except after the last block
+        if text and text[-1] in ".!?" and block.next().isValid():
+            count += 1
+        return count
+
+    def rebuild(self):
+        self.counts = []
+        block = self.document.firstBlock()
+        while block.isValid():
+            self.counts.append(self.count_block(block))
+            block = block.next()
+        self.total = sum(self.counts)
+
+    def update(self, position, removed, added):
+        first = self.document.findBlock(position)
+        last = self.document.findBlock(position + added)
+        if not last.isValid():
+            last = self.document.lastBlock()
+        first_number = first.blockNumber()
+        last_number = last.blockNumber()
+
+        # How many of the old blocks the edited range replaced
+        replaced = (last_number - first_number + 1) - (self.document.blockCount() - len(self.counts))
+        if replaced < 0 or first_number + replaced > len(self.counts):
+            self.rebuild()
+            return
+
+        new_counts = []
+        block = first
+        while block.isValid() and block.blockNumber() <= last_number:
+            new_counts.append(self.count_block(block))
+            block = block.next()
+        self.total += sum(new_counts) - sum(self.counts[first_number:first_number + replaced])
+        self.counts[first_number:first_number + replaced] = new_counts
+
+    def pending(self):
+        """Sentence endings added since the last call to mark_processed."""
+        return max(0, self.total - self.processed)
+
+    def mark_processed(self):
+        self.processed = self.total
+        self.processed_cursor.movePosition(QTextCursor.End)
+
+    def last_lines_span(self, n=4):
+        """
+        The last `n` non-empty lines written after the processed position, as
+        (document position, text). The text is an exact slice of the document.
+        """
+        start = self.processed_cursor.position()
+        lines = []
+        block = self.document.lastBlock()
+        while block.isValid() and len(lines) < n:
+            block_start = block.position()
+            if block_start + block.length() <= start:
+                break
+            offset = max(0, start - block_start)
+            text = block.text()[offset:]
+            # Trailing blank lines do not count towards n
+            if lines or text.strip():
+                lines.append((block_start + offset, text))
+            block = block.previous()
+        if not lines:
+            return start, ""
+        lines.reverse()
+        text = "\n".join(line for _, line in lines)
+        stripped = text.lstrip()
+        return lines[0][0] + len(text) - len(stripped), stripped.rstrip()
+
+    def last_lines(self, n=4):
+        return self.last_lines_span(n)[1]
@@ -0,0 +1,156 @@
+import json
+import os
+
+CHECKPOINT_FILE = "checkpoint.json"
+
+
+def _write_json(path, data):
+    """Replace `path` atomically, so a crash leaves either the old or the new contents."""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class ShardWriter:
+    """
+    Sentence output split into size-bounded shards that can be resumed after a crash.
+
+    Sentences go to <out_dir>/<prefix>-00000.txt, -00001.txt, ... and a
+    shard is closed at the first page boundary after it reaches `max_bytes`.
+    checkpoint() syncs the open shard and records the last completed page
+    id, its stream offset and the shard's length in checkpoint.json. On
+    restart the shard is truncated back to that length, so anything written
+    after the last checkpoint is redone rather than duplicated. Every shard
+    has a <prefix>-NNNNN.json manifest with its sentence count and page range.
+    """
+
+    def __init__(self, out_dir, prefix="sentences", max_bytes=256 * 1024 * 1024):
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.checkpoint_path = os.path.join(out_dir, CHECKPOINT_FILE)
+        self.state = {
+            "last_page_id": None,   # last page whose sentences are fully written
+            "stream_offset": None,  # bz2 stream holding that page (multistream dumps)
+            "pages": 0,
+            "sentences": 0,
+            "shard": 0,
+            "shard_bytes": 0,
+            "shard_pages": 0,
+            "shard_sentences": 0,
+            "shard_first_page_id": None,
+            "complete": False,
+        }
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                self.state.update(json.load(f))
+            print(f"↩️ Resuming after page {self.state['last_page_id']} "
+                  f"({self.state['pages']} pages, shard {self.state['shard']})")
+        self.file = None
+        if not self.complete:
+            self._open_shard()
+
+    @property
+    def complete(self):
+        return self.state["complete"]
+
+    @property
+    def last_page_id(self):
+        return self.state["last_page_id"]
+
+    @property
+    def stream_offset(self):
+        return self.state["stream_offset"]
+
+    def is_done(self, page_id):
+        """True if `page_id` was written before the last checkpoint. Dump page ids only increase."""
+        last = self.state["last_page_id"]
+        return last is not None and page_id <= last
+
+    def shard_path(self, index, extension=".txt"):
+        return os.path.join(self.out_dir, f"{self.prefix}-{index:05d}{extension}")
+
+    def _open_shard(self):
+        self.file = open(self.shard_path(self.state["shard"]), "ab")
+        # Drop whatever an interrupted run wrote after its last checkpoint
+        self.file.truncate(self.state["shard_bytes"])
+
+    def write_page(self, page_id, sentences, stream_offset=None):
+        """Append the sentences of one page. A page never straddles two shards."""
+        state = self.state
+        if state["shard_bytes"] >= self.max_bytes:
+            self._rotate()
+        data = "".join(s + "\n" for s in sentences).encode("utf-8")
+        self.file.write(data)
+        if state["shard_first_page_id"] is None:
+            state["shard_first_page_id"] = page_id
+        state["last_page_id"] = page_id
+        state["stream_offset"] = stream_offset
+        state["pages"] += 1
+        state["sentences"] += len(sentences)
+        state["shard_bytes"] += len(data)
+        state["shard_pages"] += 1
+        state["shard_sentences"] += len(sentences)
+
+    def _write_manifest(self, complete):
+        state = self.state
+        _write_json(self.shard_path(state["shard"], ".json"), {
+            "path": os.path.basename(self.shard_path(state["shard"])),
+            "sentences": state["shard_sentences"],
+            "pages": state["shard_pages"],
+            "bytes": state["shard_bytes"],
+            "first_page_id": state["shard_first_page_id"],
+            "last_page_id": state["last_page_id"],
+            "complete": complete,
+        })
+
+    def checkpoint(self, complete_shard=False):
+        """Make everything written so far durable and record it as done."""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self._write_manifest(complete_shard)
+        _write_json(self.checkpoint_path, self.state)
+
+    def _rotate(self):
+        self.checkpoint(complete_shard=True)
+        self.file.close()
+        self.state.update(shard=self.state["shard"] + 1, shard_bytes=0, shard_pages=0,
+                          shard_sentences=0, shard_first_page_id=None)
+        _write_json(self.checkpoint_path, self.state)
+        self._open_shard()
+
+    def finish(self):
+        """Close the last shard and mark the run complete, so a rerun does nothing."""
+        if self.complete:
+            return
+        self.state["complete"] = True
+        self.checkpoint(complete_shard=True)
+        self.file.close()
+        print(f"✅ {self.state['sentences']} sentences from {self.state['pages']} pages "
+              f"in {self.state['shard'] + 1} shards ({self.out_dir})")
+
+    def close(self):
+        """Checkpoint and close without finishing, e.g. on KeyboardInterrupt."""
+        if self.file is not None and not self.file.closed:
+            self.checkpoint()
+            self.file.close()
+
+
+def read_manifests(out_dir, complete_only=True):
+    """Manifests of the shards in `out_dir` in shard order, with "path" joined to `out_dir`."""
+    manifests = []
+    for name in sorted(os.listdir(out_dir)):
+        if not name.endswith(".json") or name == CHECKPOINT_FILE:
+            continue
+        with open(os.path.join(out_dir, name), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if complete_only and not manifest["complete"]:
+            print(f"⏳ Skipping {manifest['path']}, the conversion is still writing it")
+            continue
+        manifest["path"] = os.path.join(out_dir, manifest["path"])
+        manifests.append(manifest)
+    return manifests
@@ -1,13 +1,20 @@
-import json
 import spacy
 import re
+import threading
 from collections import defaultdict
-from pathlib import Path
+
+from tag_store import get_store
 
 nlp = spacy.load("en_core_web_sm")
+# Link matching runs on pool threads, one parse at a time keeps spaCy safe
+nlp_lock = threading.Lock()
+
+# Trie key under which a node stores the canonical tags ending at that node.
+# Tags that lemmatize alike ("Physics", "physics") share the node; the newest one matches.
+_TAG = None
 
 def lemmatize_phrase(phrase, nlp):
-    return tuple(token.lemma_.lower() for token in nlp(phrase))
+    return tuple(token.lemma_.lower() for token in nlp(phrase) if not token.is_space)
 
 def build_lemma_to_tag_map(tags, nlp):
     lemma_map = {}
@@ -16,69 +23,146 @@ def build_lemma_to_tag_map(tags, nlp):
         lemma_map[lemma] = tag
     return lemma_map
 
-def find_and_replace_tags(text, json_path):
-    json_path = Path(json_path)
-
-    if json_path.exists():
-        with open(json_path, 'r', encoding='utf-8') as f:
-            tags = json.load(f)
-    else:
-        tags = {}
-
-    tag_values = list(tags.values())
-    lemma_to_tag = build_lemma_to_tag_map(tag_values, nlp)
-
-    # Step 1: Track all existing [[tag]] spans so we can skip them
-    existing_links = [
-        (m.start(), m.end()) for m in re.finditer(r'\[\[.*?\]\]', text)
-    ]
-
-    def is_inside_existing_link(start, end):
-        return any(link_start <= start < link_end or link_start < end <= link_end for link_start, link_end in existing_links)
-
-    doc = nlp(text)
-    lemmas_with_indices = [
-        (token.lemma_.lower(), token.idx, token.idx + len(token.text), token.text)
-        for token in doc if not token.is_space
-    ]
-
-    replacements = []
-    i = 0
-
-    while i < len(lemmas_with_indices):
-        match_found = False
-
-        for tag_lemmas, canonical_tag in lemma_to_tag.items():
-            tag_len = len(tag_lemmas)
-            window = lemmas_with_indices[i:i + tag_len]
-
-            if len(window) < tag_len:
-                continue
-
-            window_lemmas = tuple(w[0] for w in window)
-            start = window[0][1]
-            end = window[-1][2]
-
-            if is_inside_existing_link(start, end):
-                continue  # 🔒 Skip existing [[linked]] text
-
-            if window_lemmas == tag_lemmas:
-                matched_text = text[start:end]
-                replacements.append((start, end, f"[[{canonical_tag}]]"))
-                i += tag_len
-                match_found = True
-                break
-
-        if not match_found:
-            i += 1
-
-    # Sort and apply replacements in reverse order
-    replacements.sort(reverse=True)
-    for start, end, replacement in replacements:
-        text = text[:start] + replacement + text[end:]
-
-    # Save updated tags to file (optional – or skip if you're not modifying tags)
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(tags, f, indent=2)
 
-    return text
+class TagMatcher:
+    """
+    Persistent lemma-sequence index over the known tags.
+
+    Tags are lemmatized once when added and stored in a trie keyed on lemmas,
+    so matching a document is a single left-to-right pass over its tokens
+    with longest-match-first semantics.
+    """
+
+    def __init__(self, nlp):
+        self.nlp = nlp
+        self.root = {}
+        self.tag_lemmas = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.tag_lemmas)
+
+    def __contains__(self, tag):
+        return tag in self.tag_lemmas
+
+    def add(self, tags):
+        new_tags = [t for t in dict.fromkeys(tags) if t and t not in self.tag_lemmas]
+        if not new_tags:
+            return
+        # Lemmatize outside the lock, it is the expensive part
+        with nlp_lock:
+            docs = self.nlp.pipe(new_tags)
+            lemmas = [tuple(tok.lemma_.lower() for tok in doc if not tok.is_space) for doc in docs]
+        with self.lock:
+            for tag, lemma in zip(new_tags, lemmas):
+                # Another sync may have added it while this one was lemmatizing
+                if not lemma or tag in self.tag_lemmas:
+                    continue
+                node = self.root
+                for part in lemma:
+                    node = node.setdefault(part, {})
+                node.setdefault(_TAG, []).append(tag)
+                self.tag_lemmas[tag] = lemma
+
+    def remove(self, tags):
+        with self.lock:
+            for tag in tags:
+                lemma = self.tag_lemmas.pop(tag, None)
+                if lemma is None:
+                    continue
+                path = [self.root]
+                for part in lemma:
+                    node = path[-1].get(part)
+                    if node is None:
+                        break
+                    path.append(node)
+                else:
+                    node_tags = path[-1].get(_TAG, [])
+                    if tag in node_tags:
+                        node_tags.remove(tag)
+                    if not node_tags:
+                        path[-1].pop(_TAG, None)
+                # Prune branches that no longer lead to any tag
+                for depth in range(len(path) - 1, 0, -1):
+                    if path[depth]:
+                        break
+                    del path[depth - 1][lemma[depth - 1]]
+
+    def sync(self, tags):
+        """Bring the index in line with `tags`, touching only what changed."""
+        wanted = set(tags)
+        with self.lock:
+            stale = [t for t in self.tag_lemmas if t not in wanted]
+        if stale:
+            self.remove(stale)
+        self.add(t for t in tags if t not in self.tag_lemmas)
+
+    def find_spans(self, tokens):
+        """
+        Match `tokens`, a list of (lemma, start, end, linked) tuples, against the index.
+        Tokens flagged as linked are never part of a match.
+        Returns (start, end, tag) character spans in document order.
+        """
+        spans = []
+        n = len(tokens)
+        i = 0
+        with self.lock:
+            while i < n:
+                node = self.root
+                best = None
+                j = i
+                while j < n and not tokens[j][3]:
+                    node = node.get(tokens[j][0])
+                    if node is None:
+                        break
+                    j += 1
+                    if _TAG in node:
+                        best = (j, node[_TAG][-1])
+                if best is None:
+                    i += 1
+                    continue
+                end, tag = best
+                spans.append((tokens[i][1], tokens[end - 1][2], tag))
+                i = end
+        return spans
+
+
+matcher = TagMatcher(nlp)
+
+def tokenize_for_matching(text):
+    """Lemmatize `text` and flag every token that overlaps an existing [[link]]."""
+    existing_links = [(m.start(), m.end()) for m in re.finditer(r'\[\[.*?\]\]', text)]
+    tokens = []
+    k = 0
+    with nlp_lock:
+        doc = nlp(text)
+    for token in doc:
+        if token.is_space:
+            continue
+        start = token.idx
+        end = start + len(token.text)
+        # Both lists are sorted, so one pointer walk finds the overlapping link
+        while k < len(existing_links) and existing_links[k][1] <= start:
+            k += 1
+        linked = k < len(existing_links) and existing_links[k][0] < end
+        tokens.append((token.lemma_.lower(), start, end, linked))
+    return tokens
+
+def find_tag_spans(text, tags):
+    """Return (start, end, canonical_tag) spans in `text` for the given alias -> tag dict."""
+    matcher.sync(tags.values())
+    return matcher.find_spans(tokenize_for_matching(text))
+
+def find_and_replace_tags(text, store=None):
+    tags = (store or get_store()).snapshot()
+    spans = find_tag_spans(text, tags)
+
+    # Splice the replacements in a single pass
+    pieces = []
+    last = 0
+    for start, end, canonical_tag in spans:
+        pieces.append(text[last:start])
+        pieces.append(f"[[{canonical_tag}]]")
+        last = end
+    pieces.append(text[last:])
+    return "".join(pieces)
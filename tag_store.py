@@ -0,0 +1,210 @@
+import atexit
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+DB_PATH = "ner_tags.db"
+JSON_PATH = "ner_tags.json"
+
+
+class TagStore:
+    """
+    Alias -> tag mapping shared by every editor window and process.
+
+    Reads are served from an in-memory dict. Writes update the dict at once
+    and are flushed to SQLite (WAL mode) in batches after `flush_delay`
+    seconds, so bursts of NER results cost one transaction. Other processes
+    see the changes through `refresh()`, which reloads only when SQLite
+    reports a commit from another connection.
+    """
+
+    def __init__(self, db_path=DB_PATH, json_path=JSON_PATH, flush_delay=0.5):
+        self.db_path = db_path
+        self.json_path = json_path
+        self.flush_delay = flush_delay
+        self.lock = threading.RLock()
+        self.tags = {}
+        self.pending = {}  # alias -> tag, None marks a deletion
+        self.listeners = []
+        self.timer = None
+
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS tags (alias TEXT PRIMARY KEY, tag TEXT NOT NULL)")
+
+        # First run: seed the database from the legacy JSON file
+        if json_path and os.path.exists(json_path) and self.conn.execute("SELECT 1 FROM tags LIMIT 1").fetchone() is None:
+            self.import_json(json_path)
+            self.flush()
+        self.reload()
+
+    # Reads
+
+    def __contains__(self, alias):
+        with self.lock:
+            return alias in self.tags
+
+    def __len__(self):
+        with self.lock:
+            return len(self.tags)
+
+    def get(self, alias, default=None):
+        with self.lock:
+            return self.tags.get(alias, default)
+
+    def snapshot(self):
+        """Return a copy of the alias -> tag dict that is safe to use from any thread."""
+        with self.lock:
+            return dict(self.tags)
+
+    # Writes
+
+    def set(self, alias, tag):
+        self.update({alias: tag})
+
+    def update(self, mapping):
+        with self.lock:
+            changes = {a: t for a, t in mapping.items() if self.tags.get(a) != t}
+            if not changes:
+                return
+            self.tags.update(changes)
+            self.pending.update(changes)
+            self._schedule_flush()
+        self._notify(changes)
+
+    def delete(self, aliases):
+        with self.lock:
+            changes = {a: None for a in aliases if a in self.tags}
+            if not changes:
+                return
+            for alias in changes:
+                del self.tags[alias]
+            self.pending.update(changes)
+            self._schedule_flush()
+        self._notify(changes)
+
+    def replace_all(self, mapping):
+        """Make the store equal to `mapping`, writing only the difference."""
+        with self.lock:
+            removed = [a for a in self.tags if a not in mapping]
+        self.delete(removed)
+        self.update(mapping)
+
+    # Persistence
+
+    def _schedule_flush(self):
+        if self.timer is None:
+            self.timer = threading.Timer(self.flush_delay, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def flush(self):
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if not self.pending:
+                return
+            upserts = [(a, t) for a, t in self.pending.items() if t is not None]
+            deletes = [(a,) for a, t in self.pending.items() if t is None]
+            self.pending = {}
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.executemany("INSERT OR REPLACE INTO tags (alias, tag) VALUES (?, ?)", upserts)
+                self.conn.executemany("DELETE FROM tags WHERE alias = ?", deletes)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def _data_version(self):
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def reload(self):
+        """Load the table, keeping local writes that have not been flushed yet."""
+        with self.lock:
+            self.data_version = self._data_version()
+            tags = dict(self.conn.execute("SELECT alias, tag FROM tags"))
+            for alias, tag in self.pending.items():
+                if tag is None:
+                    tags.pop(alias, None)
+                else:
+                    tags[alias] = tag
+            old = self.tags
+            self.tags = tags
+            changes = {a: t for a, t in tags.items() if old.get(a) != t}
+            changes.update({a: None for a in old if a not in tags})
+        if changes:
+            self._notify(changes)
+        return changes
+
+    def refresh(self):
+        """Pick up commits made by other processes. Cheap when nothing changed."""
+        with self.lock:
+            if self._data_version() == self.data_version:
+                return {}
+        return self.reload()
+
+    def import_json(self, path=None):
+        with open(path or self.json_path, "r", encoding="utf-8") as f:
+            self.update(json.load(f))
+
+    def export_json(self, path=None):
+        with open(path or self.json_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2, ensure_ascii=False)
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    # Change notifications
+
+    def subscribe(self, callback):
+        """Call `callback(changes)` with an alias -> tag (or None if deleted) dict on every change."""
+        with self.lock:
+            self.listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            if callback in self.listeners:
+                self.listeners.remove(callback)
+
+    def _notify(self, changes):
+        with self.lock:
+            listeners = list(self.listeners)
+        for callback in listeners:
+            try:
+                callback(changes)
+            except Exception as e:
+                print(f"❌ Tag listener failed: {e}")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """Return the process-wide TagStore, opening it on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = TagStore()
+            atexit.register(_store.close)
+        return _store
+
+
+if __name__ == "__main__":
+    # python tag_store.py import|export [path.json]
+    if len(sys.argv) < 2 or sys.argv[1] not in ("import", "export"):
+        print("Usage: python tag_store.py import|export [path.json]")
+        sys.exit(1)
+    store = get_store()
+    path = sys.argv[2] if len(sys.argv) > 2 else JSON_PATH
+    if sys.argv[1] == "import":
+        store.import_json(path)
+        store.flush()
+    else:
+        store.export_json(path)
+    print(f"✅ {sys.argv[1].capitalize()}ed {len(store)} tags ({path})")
@@ -0,0 +1,297 @@
+from collections import defaultdict
+
+from PyQt5.QtCore import Qt, QAbstractProxyModel, QAbstractTableModel, QModelIndex
+
+HEADERS = ["Alias", "Tag"]
+
+
+class TagSearchIndex:
+    """
+    Trigram index over the alias and tag of every row, for substring search.
+
+    A query of three or more characters only verifies the rows that contain
+    all of its trigrams. Shorter queries fall back to a scan, optionally
+    restricted to the rows that matched the previous, shorter query.
+    """
+
+    def __init__(self):
+        self.texts = {}
+        self.grams = defaultdict(set)
+
+    @staticmethod
+    def trigrams(text):
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def add(self, key, alias, tag):
+        self.remove(key)
+        # The newline keeps a query from matching across the two columns
+        text = f"{alias}\n{tag}".lower()
+        self.texts[key] = text
+        for gram in self.trigrams(text):
+            self.grams[gram].add(key)
+
+    def remove(self, key):
+        text = self.texts.pop(key, None)
+        if text is None:
+            return
+        for gram in self.trigrams(text):
+            keys = self.grams[gram]
+            keys.discard(key)
+            if not keys:
+                del self.grams[gram]
+
+    def search(self, query, within=None):
+        query = query.lower()
+        if len(query) < 3:
+            candidates = self.texts.keys() if within is None else within
+        else:
+            postings = sorted((self.grams.get(g, set()) for g in self.trigrams(query)), key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+            if within is not None:
+                candidates &= within
+        texts = self.texts
+        return {key for key in candidates if query in texts.get(key, "")}
+
+
+class TagTableModel(QAbstractTableModel):
+    """Alias/tag rows backed directly by a list, updated through row-level diffs."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []  # [row_id, alias, tag]
+        self.row_of_id = {}
+        self.row_of_alias = {}
+        self.next_id = 0
+        self.search_index = TagSearchIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        return self.rows[index.row()][index.column() + 1]
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return super().flags(index) | Qt.ItemIsEditable
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+        row = self.rows[index.row()]
+        if index.column() == 0 and self.row_of_alias.get(row[1]) == index.row():
+            del self.row_of_alias[row[1]]
+        row[index.column() + 1] = value
+        if index.column() == 0:
+            self.row_of_alias[value] = index.row()
+        self.search_index.add(row[0], row[1], row[2])
+        self.dataChanged.emit(index, index, [role])
+        return True
+
+    def _reindex(self, start=0):
+        for i in range(start, len(self.rows)):
+            row_id, alias, _ = self.rows[i]
+            self.row_of_id[row_id] = i
+            self.row_of_alias[alias] = i
+
+    def append_rows(self, items):
+        items = list(items)
+        if not items:
+            return
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(items) - 1)
+        for alias, tag in items:
+            self.rows.append([self.next_id, alias, tag])
+            self.search_index.add(self.next_id, alias, tag)
+            self.next_id += 1
+        self._reindex(first)
+        self.endInsertRows()
+
+    def remove_rows(self, rows):
+        rows = sorted(set(rows), reverse=True)
+        # Contiguous runs, bottom-up so earlier runs keep their row numbers
+        ranges = []
+        for row in rows:
+            if ranges and ranges[-1][0] == row + 1:
+                ranges[-1][0] = row
+            else:
+                ranges.append([row, row])
+        for first, last in ranges:
+            self.beginRemoveRows(QModelIndex(), first, last)
+            for row in range(first, last + 1):
+                row_id, alias, _ = self.rows[row]
+                del self.row_of_id[row_id]
+                if self.row_of_alias.get(alias) == row:
+                    del self.row_of_alias[alias]
+                self.search_index.remove(row_id)
+            del self.rows[first:last + 1]
+            # Rows below moved up; views (and the filter proxy) read the maps in rowsRemoved
+            self._reindex(first)
+            self.endRemoveRows()
+
+    def apply_changes(self, changes):
+        """Apply an alias -> tag (None when deleted) diff as row inserts, updates and removals."""
+        removed = []
+        added = []
+        for alias, tag in changes.items():
+            row = self.row_of_alias.get(alias)
+            if tag is None:
+                if row is not None:
+                    removed.append(row)
+            elif row is None:
+                added.append((alias, tag))
+            elif self.rows[row][2] != tag:
+                self.rows[row][2] = tag
+                self.search_index.add(self.rows[row][0], alias, tag)
+                cell = self.index(row, 1)
+                self.dataChanged.emit(cell, cell)
+        self.remove_rows(removed)
+        self.append_rows(added)
+
+    def sync(self, mapping):
+        """Make the rows equal to `mapping`, touching only rows that differ."""
+        changes = {alias: None for alias in self.row_of_alias if alias not in mapping}
+        changes.update(mapping)
+        self.apply_changes(changes)
+
+    def to_dict(self):
+        data = {}
+        for _, alias, tag in self.rows:
+            alias, tag = alias.strip(), tag.strip()
+            if alias and tag:
+                data[alias] = tag
+        return data
+
+
+class TagFilterProxy(QAbstractProxyModel):
+    """Shows the rows of a TagTableModel that match a search query, found through its index."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.query = ""
+        self.visible = None  # matching source rows in order, None when unfiltered
+        self.proxy_row = {}
+
+    def setSourceModel(self, model):
+        super().setSourceModel(model)
+        model.dataChanged.connect(self.source_data_changed)
+        model.rowsAboutToBeInserted.connect(self.source_rows_about_to_be_inserted)
+        model.rowsInserted.connect(self.source_rows_inserted)
+        model.rowsAboutToBeRemoved.connect(self.source_rows_about_to_be_removed)
+        model.rowsRemoved.connect(self.source_rows_removed)
+        model.modelReset.connect(self.refilter)
+
+    def set_query(self, query):
+        previous = self.query
+        self.query = query
+        within = None
+        # Typing more characters can only narrow the previous matches
+        if previous and query.lower().startswith(previous.lower()) and self.visible is not None:
+            rows = self.sourceModel().rows
+            within = {rows[r][0] for r in self.visible}
+        self.beginResetModel()
+        self._compute(within)
+        self.endResetModel()
+
+    def refilter(self):
+        self.beginResetModel()
+        self._compute()
+        self.endResetModel()
+
+    def _compute(self, within=None):
+        if not self.query:
+            self.visible = None
+            self.proxy_row = {}
+            return
+        model = self.sourceModel()
+        ids = model.search_index.search(self.query, within)
+        self.visible = sorted(model.row_of_id[i] for i in ids)
+        self.proxy_row = {row: i for i, row in enumerate(self.visible)}
+
+    # Source changes: forwarded directly when unfiltered, refiltered otherwise
+
+    def source_data_changed(self, top_left, bottom_right, roles=[]):
+        if self.visible is not None:
+            # An edited row may have started or stopped matching the query
+            model = self.sourceModel()
+            rows = range(top_left.row(), bottom_right.row() + 1)
+            matching = model.search_index.search(self.query, {model.rows[row][0] for row in rows})
+            if any((model.rows[row][0] in matching) != (row in self.proxy_row) for row in rows):
+                self.refilter()
+                return
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            proxy_row = row if self.visible is None else self.proxy_row.get(row)
+            if proxy_row is not None:
+                self.dataChanged.emit(self.index(proxy_row, top_left.column()),
+                                      self.index(proxy_row, bottom_right.column()), roles)
+
+    def source_rows_about_to_be_inserted(self, parent, first, last):
+        if self.visible is None:
+            self.beginInsertRows(QModelIndex(), first, last)
+
+    def source_rows_inserted(self, parent, first, last):
+        if self.visible is None:
+            self.endInsertRows()
+        else:
+            self.refilter()
+
+    def source_rows_about_to_be_removed(self, parent, first, last):
+        if self.visible is None:
+            self.beginRemoveRows(QModelIndex(), first, last)
+
+    def source_rows_removed(self, parent, first, last):
+        if self.visible is None:
+            self.endRemoveRows()
+        else:
+            self.refilter()
+
+    # QAbstractProxyModel interface
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self.sourceModel() is None:
+            return 0
+        return self.sourceModel().rowCount() if self.visible is None else len(self.visible)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid() or self.sourceModel() is None:
+            return 0
+        return self.sourceModel().columnCount()
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not (0 <= row < self.rowCount()) or not (0 <= column < self.columnCount()):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=None):
+        if index is None:
+            return super().parent()
+        return QModelIndex()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal:
+            return self.sourceModel().headerData(section, orientation, role)
+        return super().headerData(section, orientation, role)
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid():
+            return QModelIndex()
+        row = proxy_index.row() if self.visible is None else self.visible[proxy_index.row()]
+        return self.sourceModel().index(row, proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        row = source_index.row() if self.visible is None else self.proxy_row.get(source_index.row())
+        if row is None:
+            return QModelIndex()
+        return self.index(row, source_index.column())
@@ -0,0 +1,141 @@
+import argparse
+import os
+import re
+import time
+from collections import deque
+from functools import partial
+from multiprocessing import Pool
+
+from tqdm import tqdm
+
+import predict_ner
+from inference_executor import limit_threads, thread_budget
+from tag_store import get_store
+
+try:
+    from nltk.tokenize import sent_tokenize
+    sent_tokenize("Warm up. The punkt model.")
+except Exception:
+    sent_tokenize = None
+
+
+def split_sentences(text):
+    if sent_tokenize is not None:
+        return sent_tokenize(text)
+    return re.split(r'(?<=[.!?])\s+', text)
+
+
+def iter_notes(directory, pattern):
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if re.fullmatch(pattern, name):
+                yield os.path.join(root, name)
+
+
+def iter_batches(paths, batch_size):
+    """Stream the sentences of every note as lists of `batch_size` sentences."""
+    batch = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for paragraph in f:
+                for sentence in split_sentences(paragraph.strip()):
+                    if sentence.strip():
+                        batch.append(sentence)
+                        if len(batch) == batch_size:
+                            yield batch
+                            batch = []
+    if batch:
+        yield batch
+
+
+def init_worker(backend, threads):
+    # Each process gets its share of the cores instead of torch's default of all of them
+    limit_threads(threads)
+    predict_ner.load_pipeline(backend)
+
+
+def tag_batch(batch, backend=None):
+    # One tokenization gives both the entities and the token count
+    results, tokens = predict_ner.ner_batch(batch, backend=backend)
+    tags = set()
+    # Same text-slice tags as the editor, not the tokenizer's normalized "word" strings
+    for sentence, entities in zip(batch, results):
+        tags.update(e["tag"] for e in predict_ner.merge_entity_offsets(sentence, entities))
+    return tags, len(batch), tokens
+
+
+def tag_note(path, batch_size=32, backend=None):
+    """Tag a whole note with strided windows instead of sentence by sentence."""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    entities, tokens = predict_ner.ner_document(text, batch_size=batch_size, backend=backend)
+    return {e["tag"] for e in predict_ner.merge_entity_offsets(text, entities)}, 1, tokens
+
+
+def imap_bounded(pool, work, items, window):
+    """
+    Ordered pool.imap that reads at most `window` items ahead of the results.
+    Pool.imap would pull the whole `items` generator into its task queue at once.
+    """
+    pending = deque()
+    for item in items:
+        pending.append(pool.apply_async(work, (item,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def tag_vault(directory, pattern=r".*\.txt", batch_size=32, workers=1, backend=None, whole_document=False):
+    paths = list(iter_notes(directory, pattern))
+    print(f"📄 {len(paths)} notes in {directory}")
+    if whole_document:
+        items, work, unit = paths, partial(tag_note, batch_size=batch_size, backend=backend), " notes"
+    else:
+        items, work, unit = iter_batches(paths, batch_size), partial(tag_batch, backend=backend), " sentences"
+
+    tags = set()
+    units = tokens = 0
+    start = time.perf_counter()
+    progress = tqdm(desc="Tagging", unit=unit)
+    if workers > 1:
+        pool = Pool(workers, initializer=init_worker, initargs=(backend, thread_budget(workers)))
+        results = imap_bounded(pool, work, items, window=workers * 2)
+    else:
+        pool = None
+        results = map(work, items)
+    try:
+        for item_tags, item_units, item_tokens in results:
+            tags |= item_tags
+            units += item_units
+            tokens += item_tokens
+            progress.update(item_units)
+            progress.set_postfix(tokens_per_sec=f"{tokens / (time.perf_counter() - start):.0f}", tags=len(tags))
+    finally:
+        progress.close()
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    elapsed = time.perf_counter() - start
+    print(f"⏱ {units}{unit}, {tokens} tokens in {elapsed:.1f}s ({tokens / elapsed:.0f} tokens/s)")
+
+    # One write for the whole run
+    store = get_store()
+    before = len(store)
+    store.update({f"[[{tag}]]": tag for tag in tags})
+    store.flush()
+    print(f"🏷 {len(tags)} tags found, {len(store) - before} new")
+    return tags
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Back-fill NER tags for every note in a directory")
+    parser.add_argument("directory")
+    parser.add_argument("--pattern", default=r".*\.txt", help="regex the note file names must match")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=1, help="inference processes, each with its own model copy")
+    parser.add_argument("--backend", default=None, help="pytorch or onnx, defaults to NER_BACKEND")
+    parser.add_argument("--whole-document", action="store_true", help="tag each note in strided windows instead of sentences")
+    args = parser.parse_args()
+    tag_vault(args.directory, args.pattern, args.batch_size, args.workers, args.backend, args.whole_document)
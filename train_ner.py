@@ -1,5 +1,8 @@
+import argparse
+import re
+import time
 import torch
-from datasets import load_dataset
+import torch.nn.functional as F
 import evaluate
 import numpy as np
 from transformers import (
@@ -10,48 +13,42 @@ from transformers import (
     Trainer
 )
 
+from ner_shards import LABEL_LIST, load_tokenized
+
+parser = argparse.ArgumentParser(description="Fine-tune the NER model, or distill it into a smaller student")
+parser.add_argument("--distill", action="store_true", help="train a small student on the teacher's soft labels")
+parser.add_argument("--teacher", default="./final_3", help="trained teacher model directory")
+parser.add_argument("--student-layers", type=int, default=4, help="transformer layers kept in the student")
+parser.add_argument("--temperature", type=float, default=2.0)
+parser.add_argument("--alpha", type=float, default=0.7, help="weight of the soft-label loss against the hard labels")
+parser.add_argument("--output", default=None, help="defaults to ./final_3, or ./student with --distill")
+parser.add_argument("--train-file", default="train_set.jsonl")
+parser.add_argument("--shards", default=None, help="directory of pre-tokenized shards, built there if missing or stale")
+args = parser.parse_args()
+
 # Setup device
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 print("Using device:", device)
 
-# Step 1: Load the dataset
-dataset = load_dataset("json", data_files="train_set.jsonl")
-
-# Step 2: Define labels
-label_list = ["O", "B-ENTITY", "I-ENTITY"]
+# Step 1: Define labels
+label_list = LABEL_LIST
 label_to_id = {l: i for i, l in enumerate(label_list)}
 id_to_label = {i: l for l, i in label_to_id.items()}
 
-# Step 3: Load tokenizer and model
-model = AutoModelForTokenClassification.from_pretrained("ner-model-final").to(device)
-tokenizer = AutoTokenizer.from_pretrained("ner-model-final")
+# Step 2: Load tokenizer and model
+if args.distill:
+    # The student reuses the teacher's tokenizer so both see the same tokens
+    teacher = AutoModelForTokenClassification.from_pretrained(args.teacher).to(device)
+    teacher.eval()
+    tokenizer = AutoTokenizer.from_pretrained(args.teacher)
+else:
+    model = AutoModelForTokenClassification.from_pretrained("ner-model-final").to(device)
+    tokenizer = AutoTokenizer.from_pretrained("ner-model-final")
 
-print("Model is on device:", next(model.parameters()).device)
+# Step 3: Load and tokenize the dataset, or memory-map shards tokenized by an earlier run
+tokenized_dataset = load_tokenized(args.train_file, tokenizer, label_list, shards_dir=args.shards)
 
-# Step 4: Preprocessing
-def preprocess(example):
-    tokenized_inputs = tokenizer(
-        example["tokens"],
-        is_split_into_words=True,
-        truncation=True,
-        padding="max_length",
-        max_length=128,
-    )
-
-    word_ids = tokenized_inputs.word_ids()
-    label_ids = []
-    for word_idx in word_ids:
-        if word_idx is None:
-            label_ids.append(-100)
-        else:
-            label_ids.append(label_to_id[example["labels"][word_idx]])
-
-    tokenized_inputs["labels"] = label_ids
-    return tokenized_inputs
-
-tokenized_dataset = dataset.map(preprocess, batched=False)
-
-# Step 5: Metric
+# Step 4: Metric
 metric = evaluate.load("seqeval")
 
 def compute_metrics(eval_preds):
@@ -72,14 +69,79 @@ def compute_metrics(eval_preds):
         "accuracy": results["overall_accuracy"],
     }
 
-# Step 6: Trainer setup
+# Step 5: Trainer setup
 data_collator = DataCollatorForTokenClassification(tokenizer)
 
-args = TrainingArguments(
-    output_dir="./ner_model",
+def build_student(teacher, num_layers):
+    """
+    A copy of the teacher with only `num_layers` evenly spaced transformer layers,
+    initialised from the teacher's weights (embeddings, kept layers, classifier).
+    """
+    config = teacher.config.to_dict()
+    layer_key = "n_layers" if "n_layers" in config else "num_hidden_layers"
+    teacher_layers = config[layer_key]
+    config[layer_key] = num_layers
+    student = AutoModelForTokenClassification.from_config(type(teacher.config).from_dict(config))
+    keep = [round(i * (teacher_layers - 1) / max(1, num_layers - 1)) for i in range(num_layers)]
+    state = {}
+    for key, value in teacher.state_dict().items():
+        match = re.search(r"\.layer\.(\d+)\.", key)
+        if match is None:
+            state[key] = value
+        elif int(match.group(1)) in keep:
+            state[key.replace(match.group(0), f".layer.{keep.index(int(match.group(1)))}.", 1)] = value
+    student.load_state_dict(state, strict=False)
+    return student
+
+class DistillationTrainer(Trainer):
+    """Trainer whose loss mixes KL divergence to the teacher's softened logits with the usual hard-label loss."""
+
+    def __init__(self, *trainer_args, teacher=None, temperature=2.0, alpha=0.7, **kwargs):
+        super().__init__(*trainer_args, **kwargs)
+        self.teacher = teacher
+        self.temperature = temperature
+        self.alpha = alpha
+
+    def compute_loss(self, model, inputs, return_outputs=False, **kwargs):
+        outputs = model(**inputs)
+        with torch.no_grad():
+            teacher_logits = self.teacher(**{k: v for k, v in inputs.items() if k != "labels"}).logits
+        mask = inputs["labels"] != -100
+        t = self.temperature
+        soft_loss = F.kl_div(
+            F.log_softmax(outputs.logits / t, dim=-1),
+            F.softmax(teacher_logits / t, dim=-1),
+            reduction="none",
+        ).sum(-1)[mask].mean() * t * t
+        loss = self.alpha * soft_loss + (1 - self.alpha) * outputs.loss
+        return (loss, outputs) if return_outputs else loss
+
+def cpu_latency_ms(model, dataset, n=64, batch_size=16):
+    """Mean CPU forward time per example over the first `n` examples."""
+    model = model.to("cpu").eval()
+    columns = [c for c in ("input_ids", "attention_mask", "token_type_ids") if c in dataset.column_names]
+    examples = [{c: dataset[i][c] for c in columns} for i in range(min(n, len(dataset)))]
+    batches = [tokenizer.pad(examples[i:i + batch_size], return_tensors="pt") for i in range(0, len(examples), batch_size)]
+    with torch.no_grad():
+        model(**batches[0])  # warm-up
+        start = time.perf_counter()
+        for batch in batches:
+            model(**batch)
+    return (time.perf_counter() - start) * 1000 / len(examples)
+
+def model_size_mb(model):
+    return sum(p.numel() * p.element_size() for p in model.parameters()) / 2**20
+
+if args.distill:
+    model = build_student(teacher, args.student_layers).to(device)
+
+print("Model is on device:", next(model.parameters()).device)
+
+training_args = TrainingArguments(
+    output_dir="./ner_student" if args.distill else "./ner_model",
     evaluation_strategy="epoch",
     save_strategy="epoch",
-    learning_rate=2e-5,
+    learning_rate=5e-5 if args.distill else 2e-5,
     per_device_train_batch_size=16,
     per_device_eval_batch_size=16,
     num_train_epochs=10,
@@ -88,17 +150,38 @@ args = TrainingArguments(
     report_to="none"
 )
 
-trainer = Trainer(
+trainer_class = DistillationTrainer if args.distill else Trainer
+extra = {"teacher": teacher, "temperature": args.temperature, "alpha": args.alpha} if args.distill else {}
+trainer = trainer_class(
     model=model,
-    args=args,
-    train_dataset=tokenized_dataset["train"],
-    eval_dataset=tokenized_dataset["train"],
+    args=training_args,
+    train_dataset=tokenized_dataset,
+    eval_dataset=tokenized_dataset,
     tokenizer=tokenizer,
     data_collator=data_collator,
     compute_metrics=compute_metrics,
+    **extra,
 )
 
-# Step 7: Train the model
+# Step 6: Train the model
+output_dir = args.output or ("./student" if args.distill else "./final_3")
 trainer.train()
-trainer.save_model("./final_3")
-tokenizer.save_pretrained("./final_3")
\ No newline at end of file
+trainer.save_model(output_dir)
+tokenizer.save_pretrained(output_dir)
+
+# Step 7: Compare teacher and student
+if args.distill:
+    teacher_eval = Trainer(
+        model=teacher,
+        args=training_args,
+        eval_dataset=tokenized_dataset,
+        tokenizer=tokenizer,
+        data_collator=data_collator,
+        compute_metrics=compute_metrics,
+    ).evaluate()
+    student_eval = trainer.evaluate()
+    print(f"{'':10}{'F1':>8}{'CPU ms/example':>16}{'size MB':>10}{'params M':>10}")
+    for name, m, metrics in (("teacher", teacher, teacher_eval), ("student", model, student_eval)):
+        params = sum(p.numel() for p in m.parameters()) / 1e6
+        latency = cpu_latency_ms(m, tokenized_dataset)
+        print(f"{name:10}{metrics['eval_f1']:>8.4f}{latency:>16.2f}{model_size_mb(m):>10.1f}{params:>10.1f}")
\ No newline at end of file
@@ -0,0 +1,139 @@
+import re
+
+# Characters that can start markup; everything between them is copied in one slice
+_SPECIAL = re.compile(r"[{<=\[&_']")
+_ENTITY = re.compile(r"&[a-z]+;")
+_MAGIC_WORD = re.compile(r"__[A-Z]+__")
+
+
+def _skip_nested(text, start, opener, closer):
+    """Index just past the `closer` matching the `opener` at `start`, or -1 if it is never closed."""
+    depth = 0
+    i = start
+    while True:
+        next_open = text.find(opener, i)
+        next_close = text.find(closer, i)
+        if next_close < 0:
+            return -1
+        if 0 <= next_open < next_close:
+            depth += 1
+            i = next_open + len(opener)
+        else:
+            depth -= 1
+            i = next_close + len(closer)
+            if depth == 0:
+                return i
+
+
+_TABLE_PARTS = re.compile(r"\{\{|\{\||\|\}")
+
+
+def _skip_table(text, start):
+    """Index just past the "|}" closing the table at `start`, or -1. Templates inside are skipped whole,
+    so a "|}}" ending a template does not close the table."""
+    depth = 0
+    i = start
+    while True:
+        match = _TABLE_PARTS.search(text, i)
+        if match is None:
+            return -1
+        part = match.group()
+        if part == "{{":
+            end = _skip_nested(text, match.start(), "{{", "}}")
+            i = end if end >= 0 else match.end()
+        elif part == "{|":
+            depth += 1
+            i = match.end()
+        else:
+            depth -= 1
+            i = match.end()
+            if depth == 0:
+                return i
+
+
+def scrub_wikitext(text):
+    """
+    Strip wiki markup in a single left-to-right scan, keeping wikilinks as [[display text]].
+
+    Removes comments, <ref>s, HTML tags, templates and tables (both with
+    nesting), headings, bold text, HTML entities, magic words and links
+    into other namespaces such as Category: and File:. Piped links keep
+    their display text. Whitespace is not normalized here.
+
+    The output is not compatible with conv_to_clean_text.scrub_with_regex
+    and differs on most real pages, because the regex passes get these wrong:
+    - nested templates, tables holding templates and file captions with
+      links leave no "}}", "|}" or "]]" debris here;
+    - a self-closing <ref/> does not swallow the text up to the next </ref>;
+    - a namespace link is dropped on its own. The regex namespace-link
+      pass deletes from any [[link]] up to the first "]]" after a later
+      colon, e.g. "[[Paris]] is big. Note: see [[France]] ok."
+      comes out there as " ok.", here as "[[Paris]] is big. Note: see [[France]] ok."
+    """
+    out = []
+    append = out.append
+    n = len(text)
+    i = 0
+    while i < n:
+        match = _SPECIAL.search(text, i)
+        if match is None:
+            append(text[i:])
+            break
+        j = match.start()
+        if j > i:
+            append(text[i:j])
+        i = j
+        c = text[i]
+
+        if c == "{" and text.startswith("{{", i):
+            end = _skip_nested(text, i, "{{", "}}")
+        elif c == "{" and text.startswith("{|", i):
+            end = _skip_table(text, i)
+        elif c == "<":
+            if text.startswith("<!--", i):
+                end = text.find("-->", i + 4)
+                end = n if end < 0 else end + 3
+            else:
+                end = text.find(">", i)
+                if end >= 0:
+                    end += 1
+                    # <ref>...</ref> goes with its content, <ref/> is just a tag
+                    if text[i:i + 4].lower() == "<ref" and text[end - 2] != "/":
+                        close = text.find("</ref>", end)
+                        if close >= 0:
+                            end = close + 6
+        elif c == "[" and text.startswith("[[", i):
+            end = _skip_nested(text, i, "[[", "]]")
+            if end >= 0:
+                content = text[i + 2:end - 2]
+                if ":" not in content:
+                    target, pipe, display = content.partition("|")
+                    display = display.strip()
+                    if not pipe or not display:
+                        append(text[i:end])
+                    else:
+                        append(f"[[{display}]]")
+        elif c == "=" and text.startswith("==", i):
+            end = text.find("==", i + 2)
+            if end >= 0:
+                end += 2
+        elif c == "'" and text.startswith("'''", i):
+            end = text.find("'''", i + 3)
+            if end >= 0:
+                end += 3
+        elif c == "&":
+            entity = _ENTITY.match(text, i)
+            end = entity.end() if entity else -1
+        elif c == "_":
+            magic = _MAGIC_WORD.match(text, i)
+            end = magic.end() if magic else -1
+        else:
+            end = -1
+
+        if end < 0:
+            # Not markup after all (or never closed): keep the character
+            append(c)
+            i += 1
+        else:
+            i = end
+    return "".join(out)